@@ -12,6 +12,7 @@ from .mapper import (
     compile_mapping,
     Parser,
     CodeGenerator,
+    Rule,
 )
 
 __version__ = "1.0.0"
@@ -21,4 +22,5 @@ __all__ = [
     "compile_mapping",
     "Parser",
     "CodeGenerator",
+    "Rule",
 ]
\ No newline at end of file
@@ -14,8 +14,25 @@ DML Mapping Language Syntax:
 Supported types: CSV, XML, DB, EDI
 """
 
+import ast
+import dataclasses
+import functools
+import json
 import re
-from typing import Dict, List, Optional
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+
+@dataclass(slots=True, frozen=True)
+class Rule:
+    """A single mapping rule."""
+    source_field: str
+    target_field: str
+    transform: Optional[str] = None
+    condition: Optional[str] = None
+    default_value: Optional[Any] = None
+    data_type: Optional[str] = None
 
 
 class Tokenizer:
@@ -64,78 +81,95 @@ class Tokenizer:
         ('SLASH', r'/'),
         ('PERCENT', r'%'),
         ('DOT', r'\.'),
-        # IDENT before NUMBER to allow paths like "1000/OrderID" or just digits
-        ('IDENT', r'[a-zA-Z_][a-zA-Z0-9_/]*|[0-9]+[a-zA-Z0-9_/]*'),
+        # NUMBER only when no identifier/path character follows, so paths
+        # like "1000/OrderID" fall through to IDENT in the same scan.
+        ('NUMBER', r'-?\d+(?:\.\d+)?(?![\w/])'),
+        ('IDENT', r'[a-zA-Z0-9_][a-zA-Z0-9_/]*'),
         ('STRING', r'"[^"]*"|\'[^\']*\''),
-        ('NUMBER', r'-?\d+(\.\d+)?'),
-        ('SLASHPATH', r'[a-zA-Z0-9_/-]+/[a-zA-Z0-9_/]*'),
         ('WS', r'\s+'),
         ('COMMENT', r'#.*$'),
     ]
 
+    # All patterns fused into one alternation.  Alternatives are tried in
+    # TOKENS order, so the first listed pattern still wins at each position;
+    # MISMATCH catches any character no token accepts.
+    _MASTER = re.compile(
+        '|'.join(f'(?P<{name}>{pattern})' for name, pattern in TOKENS) + r'|(?P<MISMATCH>.)',
+        re.MULTILINE,
+    )
+
+    # Interned kind names indexed by group number.  The parser compares
+    # kinds against string literals, which the compiler interns, so these
+    # comparisons succeed on identity without touching the characters.
+    _KINDS = [None] * (_MASTER.groups + 1)
+    for _name, _index in _MASTER.groupindex.items():
+        _KINDS[_index] = sys.intern(_name)
+    del _name, _index
+
+    __slots__ = ('text',)
+
     def __init__(self, text: str):
         self.text = text
 
+    def itokens(self) -> Iterator[tuple]:
+        """Lazily yield (kind, value, start, end) tokens, dropping whitespace and comments."""
+        kinds = self._KINDS
+        for match in self._MASTER.finditer(self.text):
+            token_type = kinds[match.lastindex]
+            if token_type == 'MISMATCH':
+                raise SyntaxError(f"Unexpected character at position {match.start()}: '{match.group()}'")
+            if token_type not in ('WS', 'COMMENT'):
+                yield (token_type, match.group(), match.start(), match.end())
+
     def tokenize(self) -> List[tuple]:
         """Convert input text into tokens."""
-        pos = 0
-        tokens = []
-        while pos < len(self.text):
-            match = None
-            for token_type, pattern in self.TOKENS:
-                regex = re.compile(pattern, re.MULTILINE)
-                match = regex.match(self.text, pos)
-                if match:
-                    value = match.group(0)
-                    if token_type not in ('WS', 'COMMENT'):
-                        tokens.append((token_type, value))
-                    pos = match.end()
-                    break
-            if not match:
-                raise SyntaxError(f"Unexpected character at position {pos}: '{self.text[pos]}'")
-        return tokens
+        return list(self.itokens())
 
 
 class Parser:
     """Parses tokens into a structured mapping definition."""
 
+    __slots__ = ('tokenizer', '_stream', '_tok')
+
     def __init__(self, text: str):
         self.tokenizer = Tokenizer(text)
-        self.tokens: List[tuple] = []
-        self.pos = 0
+        # Tokens are pulled from the tokenizer on demand; ``_tok`` holds the
+        # single token of lookahead the grammar needs (None at end of input).
+        self._stream: Iterator[tuple] = iter(())
+        self._tok: Optional[tuple] = None
 
     def parse(self) -> Dict:
         """Parse the entire mapping definition."""
-        self.tokens = self.tokenizer.tokenize()
-        self.pos = 0
+        self._stream = self.tokenizer.itokens()
+        self._tok = next(self._stream, None)
         return self.parse_mapping()
 
     def current_token(self) -> Optional[tuple]:
-        if self.pos < len(self.tokens):
-            return self.tokens[self.pos]
-        return None
+        return self._tok
 
     def advance(self) -> Optional[tuple]:
-        token = self.current_token()
-        if token:
-            self.pos += 1
+        token = self._tok
+        if token is not None:
+            self._tok = next(self._stream, None)
         return token
 
     def expect(self, token_type: str) -> tuple:
-        token = self.current_token()
+        token = self._tok
         if not token or token[0] != token_type:
-            raise SyntaxError(f"Expected {token_type}, got {self.current_token()}")
-        self.advance()
+            raise SyntaxError(f"Expected {token_type}, got {token}")
+        self._tok = next(self._stream, None)
         return token
 
     def match(self, token_type: str) -> Optional[tuple]:
-        if self.current_token() and self.current_token()[0] == token_type:
-            return self.advance()
+        token = self._tok
+        if token is not None and token[0] == token_type:
+            self._tok = next(self._stream, None)
+            return token
         return None
 
     def skip_whitespace(self):
-        while self.current_token() and self.current_token()[0] in ('WS', 'COMMENT'):
-            self.advance()
+        while self._tok is not None and self._tok[0] in ('WS', 'COMMENT'):
+            self._tok = next(self._stream, None)
 
     def parse_mapping(self) -> Dict:
         """Parse MAPPING definition."""
@@ -150,19 +184,26 @@ class Parser:
         component = None
         rules = []
 
-        while self.current_token() and self.current_token()[0] != 'RBRACE':
-            self.skip_whitespace()
+        while True:
+            tok = self._tok
+            if not tok or tok[0] == 'RBRACE':
+                break
 
-            if self.match('SOURCE'):
+            kind = tok[0]
+            if kind == 'SOURCE':
+                self.advance()
                 sources.append(self.parse_source_target())
-            elif self.match('TARGET'):
+            elif kind == 'TARGET':
+                self.advance()
                 target = self.parse_source_target()
-            elif self.match('COMPONENT'):
+            elif kind == 'COMPONENT':
+                self.advance()
                 component = self.parse_source_target()
-            elif self.match('RULES'):
+            elif kind == 'RULES':
+                self.advance()
                 rules = self.parse_rules()
             else:
-                raise SyntaxError(f"Unexpected token in mapping: {self.current_token()}")
+                raise SyntaxError(f"Unexpected token in mapping: {tok}")
 
         self.expect('RBRACE')
 
@@ -176,7 +217,7 @@ class Parser:
 
     def parse_source_target(self) -> Dict:
         """Parse SOURCE or TARGET configuration."""
-        type_token = self.current_token()
+        type_token = self._tok
         
         if not type_token:
             raise SyntaxError("Expected type (XML|CSV|DB|EDI|JSON)")
@@ -199,7 +240,10 @@ class Parser:
 
         config = {}
 
-        while self.current_token() and self.current_token()[0] != 'RBRACE':
+        while True:
+            tok = self._tok
+            if not tok or tok[0] == 'RBRACE':
+                break
             key = self.expect('IDENT')[1]
             self.skip_whitespace()
             self.expect('COLON')
@@ -207,15 +251,17 @@ class Parser:
 
             if self.match('LBRACE'):
                 nested_config = {}
-                while self.current_token() and self.current_token()[0] != 'RBRACE':
+                while True:
+                    tok = self._tok
+                    if not tok or tok[0] == 'RBRACE':
+                        break
                     nested_key = self.expect('IDENT')[1]
                     self.skip_whitespace()
                     self.expect('COLON')
                     nested_value = self.parse_value()
                     nested_config[nested_key] = nested_value
                     self.skip_whitespace()
-                    if self.current_token() and self.current_token()[0] == 'COMMA':
-                        self.advance()
+                    self.match('COMMA')
                 self.expect('RBRACE')
                 config[key] = nested_config
             else:
@@ -223,9 +269,7 @@ class Parser:
                 config[key] = value
 
             self.skip_whitespace()
-
-            if self.current_token() and self.current_token()[0] == 'COMMA':
-                self.advance()
+            self.match('COMMA')
 
         self.expect('RBRACE')
 
@@ -236,32 +280,35 @@ class Parser:
 
     def parse_value(self):
         """Parse a value (string, number, or identifier)."""
-        token = self.current_token()
+        token = self._tok
         if not token:
             return None
 
-        if token[0] == 'STRING':
+        kind = token[0]
+        if kind == 'STRING':
             self.advance()
             return token[1][1:-1]
-        elif token[0] == 'NUMBER':
+        elif kind == 'NUMBER':
             self.advance()
             if '.' in token[1]:
                 return float(token[1])
             return int(token[1])
-        elif token[0] == 'IDENT':
+        elif kind == 'IDENT':
             self.advance()
             return token[1]
 
         return None
 
-    def parse_rules(self) -> List[Dict]:
+    def parse_rules(self) -> List[Rule]:
         """Parse mapping rules."""
         self.expect('LBRACE')
 
         rules = []
 
-        while self.current_token() and self.current_token()[0] != 'RBRACE':
-            self.skip_whitespace()
+        while True:
+            tok = self._tok
+            if not tok or tok[0] == 'RBRACE':
+                break
 
             rule = self.parse_rule()
             if rule:
@@ -270,7 +317,7 @@ class Parser:
         self.expect('RBRACE')
         return rules
 
-    def parse_rule(self) -> Optional[Dict]:
+    def parse_rule(self) -> Optional[Rule]:
         """Parse a single mapping rule."""
         if self.match('LOOP'):
             return self.parse_loop_rule()
@@ -280,8 +327,7 @@ class Parser:
 
         source_fields = []
         while True:
-            self.skip_whitespace()
-            token = self.current_token()
+            token = self._tok
 
             if token and token[0] in ('STRING', 'IDENT'):
                 source_fields.append(self.parse_value())
@@ -296,7 +342,7 @@ class Parser:
         self.skip_whitespace()
 
         target_field = None
-        token = self.current_token()
+        token = self._tok
         if token and token[0] in ('STRING', 'IDENT'):
             target_field = self.parse_value()
 
@@ -306,35 +352,35 @@ class Parser:
         data_type = None
 
         while True:
-            self.skip_whitespace()
-            token = self.current_token()
+            token = self._tok
 
             if not token:
                 break
 
-            if token[0] == 'TRANSFORM':
+            kind = token[0]
+            if kind == 'TRANSFORM':
                 self.advance()
                 transform = self.parse_function_call()
-            elif token[0] == 'IF':
+            elif kind == 'IF':
                 self.advance()
                 condition = self.parse_condition()
-            elif token[0] == 'DEFAULT':
+            elif kind == 'DEFAULT':
                 self.advance()
                 default_value = self.parse_value()
-            elif token[0] == 'AS':
+            elif kind == 'AS':
                 self.advance()
                 data_type = self.expect('IDENT')[1].lower()
             else:
                 break
 
-        return {
-            'source_field': source_fields[0] if source_fields else '',
-            'target_field': target_field or '',
-            'transform': transform,
-            'condition': condition,
-            'default_value': default_value,
-            'data_type': data_type
-        }
+        return Rule(
+            source_field=source_fields[0] if source_fields else '',
+            target_field=target_field or '',
+            transform=transform,
+            condition=condition,
+            default_value=default_value,
+            data_type=data_type,
+        )
 
     def parse_function_call(self) -> str:
         """Parse a function call."""
@@ -343,14 +389,15 @@ class Parser:
         self.expect('LPAREN')
 
         args = []
-        while self.current_token() and self.current_token()[0] != 'RPAREN':
+        while True:
+            tok = self._tok
+            if not tok or tok[0] == 'RPAREN':
+                break
             arg = self.parse_value()
             if arg is not None:
                 args.append(arg)
             self.skip_whitespace()
-
-            if self.current_token() and self.current_token()[0] == 'COMMA':
-                self.advance()
+            self.match('COMMA')
 
         self.expect('RPAREN')
 
@@ -358,135 +405,519 @@ class Parser:
 
     def parse_condition(self) -> str:
         """Parse a condition expression."""
-        parts = []
-        while self.current_token() and self.current_token()[0] not in ('RBRACE', 'TRANSFORM', 'DEFAULT', 'AS'):
-            token = self.current_token()
-            if token[0] not in ('WS', 'COMMENT'):
-                parts.append(token[1])
-            self.advance()
-        return ' '.join(parts)
-
-    def parse_loop_rule(self) -> Optional[Dict]:
+        stream, token = self._stream, self._tok
+        start = end = token[2] if token is not None else 0
+        while token is not None:
+            if token[0] in ('RBRACE', 'TRANSFORM', 'DEFAULT', 'AS'):
+                break
+            end = token[3]
+            token = next(stream, None)
+        self._tok = token
+        condition = self.tokenizer.text[start:end]
+        # The condition is emitted on a single `if` line, so one spanning
+        # lines (possibly with comments) is re-joined from its tokens.
+        if '\n' in condition:
+            condition = ' '.join(tok[1] for tok in Tokenizer(condition).itokens())
+        return condition
+
+    def parse_loop_rule(self) -> Optional[Rule]:
         """Parse a loop rule."""
         source_collection = self.expect('IDENT')[1]
         self.skip_whitespace()
         self.expect('LBRACE')
 
         sub_rules = []
-        while self.current_token() and self.current_token()[0] != 'RBRACE':
+        while True:
+            tok = self._tok
+            if not tok or tok[0] == 'RBRACE':
+                break
             rule = self.parse_rule()
             if rule:
                 sub_rules.append(rule)
 
         self.expect('RBRACE')
 
-        return {
-            'source_field': source_collection,
-            'target_field': 'loop',
-            'transform': f'loop({repr(source_collection)})'
-        }
+        return Rule(
+            source_field=source_collection,
+            target_field='loop',
+            transform=f'loop({repr(source_collection)})',
+        )
+
+
+# DML number patterns and the format() spec each one maps to.
+_NUMBER_FORMAT_SPECS = {
+    '#,##0.00': ',.2f',
+    '999999.99': '08.2f',
+}
+
+
+# --- Generated-code tables -------------------------------------------------
+#
+# Everything that varies by SOURCE/TARGET type is looked up here rather than
+# branched on inside CodeGenerator, so adding a format (or a faster variant
+# of one) means adding a table entry.
+
+# orjson is optional in the generated module; json stays as the fallback.
+_ORJSON_IMPORT = 'try:\n    import orjson\nexcept ImportError:\n    orjson = None'
+
+_IMPORTS_BY_TYPE = {
+    'XML': ['import xml.etree.ElementTree as ET'],
+    'DB': ['import sqlite3'],
+    'EDI': ['import re'],
+    'JSON': ['import json', _ORJSON_IMPORT],
+}
+
+
+def _xml_source_lines(buf: List[str]) -> None:
+    """Append the generated XML source reader to buf.
+
+    Items come out in root.iter() order: each outermost match is yielded
+    when it closes, followed by the matches nested inside it. Finished
+    elements outside a match are detached from their parent, so only the
+    open path and the current match stay in memory.
+    """
+    buf.extend((
+        '',
+        '# XML Source Handler',
+        'def read_xml_source(file_path: str, root_element: Optional[str] = None) -> Iterator[Dict]:',
+        '    """Stream items from XML file, releasing each element once read."""',
+        '    if not root_element:',
+        '        root = ET.parse(file_path).getroot()',
+        '        yield {child.tag: child.text for child in root}',
+        '        return',
+        '    stack, depth = [], 0',
+        '    for event, elem in ET.iterparse(file_path, events=("start", "end")):',
+        '        if event == "start":',
+        '            stack.append(elem)',
+        '            depth += elem.tag == root_element',
+        '            continue',
+        '        stack.pop()',
+        '        depth -= elem.tag == root_element',
+        '        if depth:',
+        '            continue',
+        '        if elem.tag == root_element:',
+        '            for match in elem.iter(root_element):',
+        '                yield {child.tag: child.text for child in match}',
+        '        if stack:',
+        '            stack[-1].remove(elem)',
+    ))
+
+
+def _csv_source_lines(buf: List[str]) -> None:
+    """Append the generated CSV source reader to buf."""
+    buf.extend((
+        '',
+        '# CSV Source Handler',
+        'def read_csv_source(file_path: str, has_header: bool = True,',
+        '                    fields: Optional[List[str]] = None) -> List[Dict]:',
+        '    """Read data from CSV file, keeping only `fields` when given."""',
+        '    with open(file_path, "r", newline="") as f:',
+        '        if fields is None:',
+        '            if has_header:',
+        '                return list(csv.DictReader(f))',
+        '            reader = csv.reader(f)',
+        '            headers = [f"col_{i}" for i in range(len(next(reader)))]',
+        '            f.seek(0)',
+        '            return list(csv.DictReader(f, fieldnames=headers))',
+        '        reader = csv.reader(f)',
+        '        first = next(reader, None)',
+        '        if first is None:',
+        '            return []',
+        '        if has_header:',
+        '            headers = first',
+        '        else:',
+        '            headers = [f"col_{i}" for i in range(len(first))]',
+        '            reader = chain((first,), reader)',
+        '        index = {name: i for i, name in enumerate(headers)}',
+        '        cols = [(name, index[name]) for name in fields if name in index]',
+        '        width = max((i for _, i in cols), default=-1) + 1',
+        '        items = []',
+        '        for row in reader:',
+        '            if not row:',
+        '                continue',
+        '            if len(row) < width:',
+        '                row += [None] * (width - len(row))',
+        '            items.append({name: row[i] for name, i in cols})',
+        '    return items',
+    ))
+
+
+def _csv_columns_source_lines(buf: List[str]) -> None:
+    """Append the generated column-wise CSV source reader to buf."""
+    buf.extend((
+        '',
+        '# CSV Column Source Handler',
+        'def read_csv_columns(file_path: str, has_header: bool, fields: List[str]):',
+        '    """Read `fields` from CSV file as (row_count, {field: column_values})."""',
+        '    with open(file_path, "r", newline="") as f:',
+        '        reader = csv.reader(f)',
+        '        first = next(reader, None)',
+        '        if first is None:',
+        '            return 0, {}',
+        '        if has_header:',
+        '            headers = first',
+        '        else:',
+        '            headers = [f"col_{i}" for i in range(len(first))]',
+        '            reader = chain((first,), reader)',
+        '        index = {name: i for i, name in enumerate(headers)}',
+        '        cols = [(name, index[name]) for name in fields if name in index]',
+        '        width = max((i for _, i in cols), default=-1) + 1',
+        '        rows = []',
+        '        for row in reader:',
+        '            if not row:',
+        '                continue',
+        '            if len(row) < width:',
+        '                row += [None] * (width - len(row))',
+        '            rows.append(row)',
+        '    return len(rows), {name: [row[i] for row in rows] for name, i in cols}',
+    ))
+
+
+def _db_source_lines(buf: List[str]) -> None:
+    """Append the generated database source reader to buf."""
+    buf.extend((
+        '',
+        '# Database Source Handler',
+        'def read_db_source(db_type: str, connection_string: str, query: str,',
+        '                   batch_size: int = 10000) -> Iterator[Dict]:',
+        '    """Stream rows from database, fetching batch_size rows at a time."""',
+        '    if db_type.lower() == "sqlite":',
+        '        conn = sqlite3.connect(connection_string)',
+        '    else:',
+        '        raise NotImplementedError(f"DB type {db_type} not implemented")',
+        '    try:',
+        '        cursor = conn.cursor()',
+        '        cursor.arraysize = batch_size',
+        '        cursor.execute(query)',
+        '        columns = [desc[0] for desc in cursor.description]',
+        '        while True:',
+        '            rows = cursor.fetchmany()',
+        '            if not rows:',
+        '                break',
+        '            for row in rows:',
+        '                yield dict(zip(columns, row))',
+        '    finally:',
+        '        conn.close()',
+    ))
+
+
+def _edi_source_lines(buf: List[str]) -> None:
+    """Append the generated EDI source reader to buf."""
+    buf.extend((
+        '',
+        '# EDI Source Handler',
+        'def read_edi_source(file_path: str, delimiter: str = "~") -> List[Dict]:',
+        '    """Read data from EDI file."""',
+        '    with open(file_path, "r") as f:',
+        '        content = f.read()',
+        '    return [',
+        '        {"segment": parts[0], "data": parts}',
+        '        for parts in (segment.split("+") for segment in content.strip().split(delimiter)',
+        '                      if segment and not segment.isspace())',
+        '    ]',
+    ))
+
+
+def _generic_source_lines(buf: List[str]) -> None:
+    """Append the generated fallback source reader to buf."""
+    buf.extend((
+        '',
+        '# Generic Source Handler',
+        'def read_source(file_path: str) -> List[Dict]:',
+        '    return []',
+    ))
+
+
+def _json_source_lines(buf: List[str]) -> None:
+    """Append the generated JSON source reader to buf."""
+    buf.extend((
+        '',
+        '# JSON Source Handler',
+        'def read_json_source(file_path: str) -> List[Dict]:',
+        '    """Read data from JSON file."""',
+        '    with open(file_path, "rb") as f:',
+        '        data = f.read()',
+        '    return orjson.loads(data) if orjson else json.loads(data)',
+    ))
+
+
+# Each *_source_call returns the expression execute_mapping uses to load one
+# aliased source with its handler. ``fields`` is the projection the rules
+# need, or None when every column must be kept.
+
+def _xml_source_call(alias: str, config: Dict, fields: Optional[List[str]]) -> str:
+    root_elem = config.get('root_element', 'Item')
+    return f'read_xml_source(input_for_{alias}, root_element="{root_elem}")'
+
+
+def _csv_source_call(alias: str, config: Dict, fields: Optional[List[str]]) -> str:
+    has_header = str(config.get('has_header', 'true')).capitalize()
+    return f'read_csv_source(input_for_{alias}, has_header={has_header}, fields={fields!r})'
+
+
+def _csv_columns_source_call(alias: str, config: Dict, fields: Optional[List[str]]) -> str:
+    has_header = str(config.get('has_header', 'true')).capitalize()
+    return f'read_csv_columns(input_for_{alias}, has_header={has_header}, fields={fields!r})'
+
+
+def _db_source_call(alias: str, config: Dict, fields: Optional[List[str]]) -> str:
+    db_type = config.get('type', 'sqlite')
+    conn_str = config.get('connection_string', '')
+    query = config.get('query', 'SELECT * FROM table')
+    escaped_query = query.replace('\\', '\\\\').replace('"', '\\"')
+    return f'read_db_source("{db_type}", "{conn_str}", """{escaped_query}""")'
+
+
+def _edi_source_call(alias: str, config: Dict, fields: Optional[List[str]]) -> str:
+    version = config.get('version', 'X12')
+    return f'read_edi_source(input_for_{alias}, delimiter="{version}")'
+
+
+def _json_source_call(alias: str, config: Dict, fields: Optional[List[str]]) -> str:
+    return f'read_json_source(input_for_{alias})'
+
+
+def _generic_source_call(alias: str, config: Dict, fields: Optional[List[str]]) -> str:
+    return f'read_source(input_for_{alias})'
+
+
+def _xml_target_lines(buf: List[str]) -> None:
+    """Append the generated XML target writer to buf."""
+    buf.extend((
+        '',
+        '# XML Target Handler',
+        'def write_target(items: List[Dict], output_path: str, root_element: str = "Root"):',
+        '    """Stream data to XML file, one serialized item at a time."""',
+        '    # Output matches ElementTree.write(encoding="utf-8", xml_declaration=True)',
+        '    with open(output_path, "w", encoding="utf-8", errors="xmlcharrefreplace") as f:',
+        '        write = f.write',
+        '        write("<?xml version=\'1.0\' encoding=\'utf-8\'?>\\n")',
+        '        if not items:',
+        '            write("<" + root_element + " />")',
+        '            return',
+        '        write("<" + root_element + ">")',
+        '        for item in items:',
+        '            if not item:',
+        '                write("<Item />")',
+        '                continue',
+        '            parts = ["<Item>"]',
+        '            for key, value in item.items():',
+        '                text = xml_escape(str(value)) if value else ""',
+        '                parts.append("<" + key + ">" + text + "</" + key + ">" if text else "<" + key + " />")',
+        '            parts.append("</Item>")',
+        '            write("".join(parts))',
+        '        write("</" + root_element + ">")',
+    ))
+
+
+def _csv_target_lines(buf: List[str]) -> None:
+    """Append the generated CSV target writer to buf."""
+    buf.extend((
+        '',
+        '# CSV Target Handler',
+        'def write_target(items: List[Dict], output_path: str):',
+        '    """Write data to CSV file."""',
+        '    if not items:',
+        '        return',
+        '    fieldnames = list(items[0].keys())',
+        '    with open(output_path, "w", newline="") as f:',
+        '        writer = csv.DictWriter(f, fieldnames=fieldnames)',
+        '        writer.writeheader()',
+        '        for item in items:',
+        '            writer.writerow(item)',
+    ))
+
+
+def _db_target_lines(buf: List[str]) -> None:
+    """Append the generated database target writer to buf."""
+    buf.extend((
+        '',
+        '# Database Target Handler',
+        'def write_db_target(items: List[Dict], db_type: str, connection_string: str, table: str):',
+        '    """Write data to database."""',
+        '    if db_type.lower() == "sqlite":',
+        '        conn = sqlite3.connect(connection_string)',
+        '    else:',
+        '        raise NotImplementedError(f"DB type {db_type} not implemented")',
+        '    conn.execute("PRAGMA journal_mode=WAL")',
+        '    conn.execute("PRAGMA synchronous=OFF")',
+        '    cursor = conn.cursor()',
+        '    if items:',
+        '        cols = list(items[0].keys())',
+        '        placeholders = ", ".join(["?" for _ in cols])',
+        '        sql = "INSERT INTO " + table + " (" + ", ".join(cols) + ") VALUES (" + placeholders + ")"',
+        '        conn.execute("BEGIN")',
+        '        cursor.executemany(sql, [',
+        '            [str(item.get(c)) if item.get(c) is not None else None for c in cols]',
+        '            for item in items',
+        '        ])',
+        '    conn.commit()',
+        '    conn.close()',
+    ))
+
+
+def _edi_target_lines(buf: List[str]) -> None:
+    """Append the generated EDI target writer to buf."""
+    buf.extend((
+        '',
+        '# EDI Target Handler',
+        'def write_target(items: List[Dict], output_path: str, delimiter: str = "~"):',
+        '    """Write data to EDI file."""',
+        '    lines = []',
+        '    for item in items:',
+        '        segment = "+".join(str(v) if v else "" for v in item.values())',
+        '        lines.append(segment)',
+        '    with open(output_path, "w") as f:',
+        '        f.write(delimiter.join(lines))',
+    ))
+
+
+def _json_target_lines(buf: List[str]) -> None:
+    """Append the generated JSON target writer to buf."""
+    buf.extend((
+        '',
+        '# JSON Target Handler',
+        'def write_target(items: List[Dict], output_path: str):',
+        '    """Write data to JSON file."""',
+        '    if orjson:',
+        '        with open(output_path, "wb") as f:',
+        '            f.write(orjson.dumps(items, option=orjson.OPT_INDENT_2))',
+        '    else:',
+        '        with open(output_path, "w") as f:',
+        '            json.dump(items, f, indent=2)',
+    ))
+
+
+def _generic_target_lines(buf: List[str]) -> None:
+    """Append the generated fallback target writer to buf."""
+    buf.extend((
+        '',
+        '# Generic Target Handler',
+        'def write_target(items: List[Dict], output_path: str):',
+        '    pass',
+    ))
+
+
+# Target-side imports differ only where the writer needs something else.
+_TARGET_IMPORTS_BY_TYPE = {
+    **_IMPORTS_BY_TYPE,
+    'XML': ['from xml.sax.saxutils import escape as xml_escape'],
+}
+
+_SOURCE_HANDLERS = {
+    'XML': _xml_source_lines,
+    'CSV': _csv_source_lines,
+    'DB': _db_source_lines,
+    'EDI': _edi_source_lines,
+    'JSON': _json_source_lines,
+}
+
+_SOURCE_CALLS = {
+    'XML': _xml_source_call,
+    'CSV': _csv_source_call,
+    'DB': _db_source_call,
+    'EDI': _edi_source_call,
+    'JSON': _json_source_call,
+}
+
+_TARGET_HANDLERS = {
+    'XML': _xml_target_lines,
+    'CSV': _csv_target_lines,
+    'DB': _db_target_lines,
+    'EDI': _edi_target_lines,
+    'JSON': _json_target_lines,
+}
 
 
 class CodeGenerator:
     """Generates executable Python code from mapping definition."""
 
     def __init__(self, mapping: Dict):
-        self.mapping = mapping
+        # Rules may also arrive as plain dicts (hand-built or deserialized)
+        rules = [rule if isinstance(rule, Rule) else Rule(**rule) for rule in mapping['rules']]
+        self.mapping = {**mapping, 'rules': rules}
 
     def generate(self) -> str:
         """Generate complete Python code."""
-        lines = []
+        buf = []
         
         # Header
-        lines.append('#!/usr/bin/env python3')
-        lines.append(f'# Data Mapping: {self.mapping["name"]}')
-        lines.append('# Auto-generated by DML Mapper')
+        buf.append('#!/usr/bin/env python3')
+        buf.append(f'# Data Mapping: {self.mapping["name"]}')
+        buf.append('# Auto-generated by DML Mapper')
         
         # Imports
-        imports = ['import csv', 'import json', 'from typing import Dict, List, Optional']
+        imports = ['import csv', 'import json', 'from itertools import chain', 'from typing import Dict, Iterator, List, Optional']
         
         # Need pandas usually for easy df to sql, or we can use native SQLite inserts.
         # Native is lighter. 
         if self.mapping.get('component'):
             imports.append('import sqlite3')
 
-        for src in self.mapping['sources']:
-            source_type = src['type'].upper()
-            if source_type in ('XML',):
-                imports.append('import xml.etree.ElementTree as ET')
-            if source_type in ('DB',):
-                imports.append('import sqlite3')
-            if source_type in ('EDI',):
-                imports.append('import re')
-            if source_type in ('JSON',):
-                imports.append('import json')
-                
+        # Ordered de-duplication keeps the emitted handler order stable
+        used_src_types = list(dict.fromkeys(src['type'].upper() for src in self.mapping['sources']))
         target_type = self.mapping['target']['type'].upper()
-        if target_type == 'XML':
-            imports.append('import xml.etree.ElementTree as ET')
-        if target_type == 'DB':
-            imports.append('import sqlite3')
-        if target_type == 'EDI':
-            imports.append('import re')
-        if target_type == 'JSON':
-            imports.append('import json')
+        for type_ in used_src_types:
+            imports.extend(_IMPORTS_BY_TYPE.get(type_, []))
+        imports.extend(_TARGET_IMPORTS_BY_TYPE.get(target_type, []))
         
-        lines.extend(sorted(set(imports)))
-        lines.append('')
+        buf.extend(sorted(set(imports)))
+        buf.append('')
         
         # Transformation functions
-        lines.extend(self._generate_transform_functions())
+        self._generate_transform_functions(buf)
         
         # Source handlers
         # Add generated readers for ALL types found
-        used_src_types = {src['type'].upper() for src in self.mapping['sources']}
+        columnar = self._is_columnar()
         for type_ in used_src_types:
-            lines.extend(self._generate_source_handlers(type_))
+            if columnar:
+                _csv_columns_source_lines(buf)
+            else:
+                _SOURCE_HANDLERS.get(type_, _generic_source_lines)(buf)
         
         # Target handlers
-        lines.extend(self._generate_target_handlers(target_type))
+        _TARGET_HANDLERS.get(target_type, _generic_target_lines)(buf)
         
-        # Main function
-        lines.extend(self._generate_main_function(target_type))
+        # Row (or column) mapper and main function
+        if columnar:
+            self._generate_column_helpers(buf)
+        else:
+            self._generate_row_mapper(buf)
+        self._generate_main_function(target_type, buf)
         
-        return '\n'.join(lines)
+        return '\n'.join(buf)
 
-    def _generate_transform_functions(self) -> List[str]:
+    def _generate_transform_functions(self, buf: List[str]) -> None:
         """Generate transformation functions."""
-        return [
+        buf.extend((
             '',
             '# Transformation Functions',
+            '_TRANSFORMS = {',
+            '    "upper": lambda value, *args: str(value).upper(),',
+            '    "lower": lambda value, *args: str(value).lower(),',
+            '    "trim": lambda value, *args: str(value).strip(),',
+            '    "int": lambda value, *args: int(value),',
+            '    "float": lambda value, *args: float(value),',
+            '    "str": lambda value, *args: str(value),',
+            '    "format_date": lambda value, *args: format_date_func(value, args[0]) if args else value,',
+            '    "format_number": lambda value, *args: format_number_func(value, args[0]) if args else value,',
+            '    "substring": lambda value, *args: (',
+            '        str(value)[int(args[0]):int(args[1]) if len(args) > 1 else None] if args else value',
+            '    ),',
+            '}',
+            '',
             'def transform_value(value, func_name: str, *args):',
             '    """Apply transformation function to value."""',
             '    if value is None:',
             '        return None',
+            '    fn = _TRANSFORMS.get(func_name)',
+            '    if fn is None:',
+            '        return value',
             '    try:',
-            '        if func_name == "upper":',
-            '            return str(value).upper()',
-            '        elif func_name == "lower":',
-            '            return str(value).lower()',
-            '        elif func_name == "trim":',
-            '            return str(value).strip()',
-            '        elif func_name == "int":',
-            '            return int(value)',
-            '        elif func_name == "float":',
-            '            return float(value)',
-            '        elif func_name == "str":',
-            '            return str(value)',
-            '        elif func_name == "format_date":',
-            '            if args:',
-            '                return format_date_func(value, args[0])',
-            '        elif func_name == "format_number":',
-            '            if args:',
-            '                return format_number_func(value, args[0])',
-            '        elif func_name == "substring":',
-            '            if args:',
-            '                start = int(args[0]) if len(args) > 0 else 0',
-            '                end = int(args[1]) if len(args) > 1 else None',
-            '                return str(value)[start:end]',
+            '        return fn(value, *args)',
             '    except Exception:',
-            '        pass',
-            '    return value',
+            '        return value',
             '',
             '# Date formatter',
             'def format_date_func(value, fmt):',
@@ -502,198 +933,48 @@ class CodeGenerator:
             '    return value',
             '',
             '# Number formatter',
+            f'_NUMBER_FORMAT_SPECS = {_NUMBER_FORMAT_SPECS!r}',
+            '',
             'def format_number_func(value, fmt):',
             '    """Format number according to format string."""',
+            '    spec = _NUMBER_FORMAT_SPECS.get(fmt)',
+            '    if spec is None:',
+            '        return value',
             '    try:',
-            '        num = float(value)',
-            '        if fmt == "#,##0.00":',
-            '            return f"{num:,.2f}"',
-            '        elif fmt == "999999.99":',
-            '            return f"{num:08.2f}"',
+            '        return format(float(value), spec)',
             '    except (ValueError, TypeError):',
-            '        pass',
-            '    return value',
-        ]
+            '        return value',
+        ))
 
-    def _generate_source_handlers(self, source_type: str) -> List[str]:
-        """Generate source reading functions."""
-        if source_type == 'XML':
-            return [
-                '',
-                '# XML Source Handler',
-                'def read_source(file_path: str, root_element: Optional[str] = None) -> List[Dict]:',
-                '    """Read data from XML file."""',
-                '    tree = ET.parse(file_path)',
-                '    root = tree.getroot()',
-                '    items = []',
-                '    for elem in root.iter(root_element) if root_element else [root]:',
-                '        item = {child.tag: child.text for child in elem}',
-                '        items.append(item)',
-                '    return items',
-            ]
-        elif source_type == 'CSV':
-            return [
-                '',
-                '# CSV Source Handler',
-                'def read_source(file_path: str, has_header: bool = True) -> List[Dict]:',
-                '    """Read data from CSV file."""',
-                '    items = []',
-                '    with open(file_path, "r", newline="") as f:',
-                '        if has_header:',
-                '            reader = csv.DictReader(f)',
-                '            for row in reader:',
-                '                items.append(dict(row))',
-                '        else:',
-                '            reader = csv.reader(f)',
-                '            headers = [f"col_{i}" for i in range(len(next(reader)))]',
-                '            f.seek(0)',
-                '            reader = csv.DictReader(f, fieldnames=headers)',
-                '            for row in reader:',
-                '                items.append(dict(row))',
-                '    return items',
-            ]
-        elif source_type == 'DB':
-            return [
-                '',
-                '# Database Source Handler',
-                'def read_db_source(db_type: str, connection_string: str, query: str) -> List[Dict]:',
-                '    """Read data from database."""',
-                '    if db_type.lower() == "sqlite":',
-                '        conn = sqlite3.connect(connection_string)',
-                '    else:',
-                '        raise NotImplementedError(f"DB type {db_type} not implemented")',
-                '    cursor = conn.cursor()',
-                '    cursor.execute(query)',
-                '    columns = [desc[0] for desc in cursor.description]',
-                '    items = [dict(zip(columns, row)) for row in cursor.fetchall()]',
-                '    conn.close()',
-                '    return items',
-            ]
-        elif source_type == 'EDI':
-            return [
-                '',
-                '# EDI Source Handler',
-                'def read_edi_source(file_path: str, delimiter: str = "~") -> List[Dict]:',
-                '    """Read data from EDI file."""',
-                '    with open(file_path, "r") as f:',
-                '        content = f.read()',
-                '    items = []',
-                '    segments = content.strip().split(delimiter)',
-                '    for segment in segments:',
-                '        if segment.strip():',
-                '            parts = segment.split("+")',
-                '            items.append({"segment": parts[0], "data": parts})',
-                '    return items',
-            ]
-        else:
-            return [
-                '',
-                '# Generic Source Handler',
-                'def read_source(file_path: str) -> List[Dict]:',
-                '    return []',
-            ]
-
-    def _generate_target_handlers(self, target_type: str) -> List[str]:
-        """Generate target writing functions."""
-        if target_type == 'XML':
-            return [
-                '',
-                '# XML Target Handler',
-                'def write_target(items: List[Dict], output_path: str, root_element: str = "Root"):',
-                '    """Write data to XML file."""',
-                '    root = ET.Element(root_element)',
-                '    for item in items:',
-                '        elem = ET.SubElement(root, "Item")',
-                '        for key, value in item.items():',
-                '            child = ET.SubElement(elem, key)',
-                '            child.text = str(value) if value else ""',
-                '    ET.ElementTree(root).write(output_path, encoding="utf-8", xml_declaration=True)',
-            ]
-        elif target_type == 'CSV':
-            return [
-                '',
-                '# CSV Target Handler',
-                'def write_target(items: List[Dict], output_path: str):',
-                '    """Write data to CSV file."""',
-                '    if not items:',
-                '        return',
-                '    fieldnames = list(items[0].keys())',
-                '    with open(output_path, "w", newline="") as f:',
-                '        writer = csv.DictWriter(f, fieldnames=fieldnames)',
-                '        writer.writeheader()',
-                '        for item in items:',
-                '            writer.writerow(item)',
-            ]
-        elif target_type == 'DB':
-            return [
-                '',
-                '# Database Target Handler',
-                'def write_db_target(items: List[Dict], db_type: str, connection_string: str, table: str):',
-                '    """Write data to database."""',
-                '    if db_type.lower() == "sqlite":',
-                '        conn = sqlite3.connect(connection_string)',
-                '    else:',
-                '        raise NotImplementedError(f"DB type {db_type} not implemented")',
-                '    cursor = conn.cursor()',
-                '    if items:',
-                '        cols = list(items[0].keys())',
-                '        placeholders = ", ".join(["?" for _ in cols])',
-                '        for item in items:',
-                '            values = [str(item.get(c)) if item.get(c) is not None else None for c in cols]',
-                '            cursor.execute(f"INSERT INTO {table} ({", ".join(cols)}) VALUES ({placeholders})", values)',
-                '    conn.commit()',
-                '    conn.close()',
-            ]
-        elif target_type == 'EDI':
-            return [
-                '',
-                '# EDI Target Handler',
-                'def write_target(items: List[Dict], output_path: str, delimiter: str = "~"):',
-                '    """Write data to EDI file."""',
-                '    lines = []',
-                '    for item in items:',
-                '        segment = "+".join(str(v) if v else "" for v in item.values())',
-                '        lines.append(segment)',
-                '    with open(output_path, "w") as f:',
-                '        f.write(delimiter.join(lines))',
-            ]
-        elif target_type == 'JSON':
-            return [
-                '',
-                '# JSON Target Handler',
-                'def write_target(items: List[Dict], output_path: str):',
-                '    """Write data to JSON file."""',
-                '    with open(output_path, "w") as f:',
-                '        json.dump(items, f, indent=2)'
-            ]
-        else:
-            return [
-                '',
-                '# Generic Target Handler',
-                'def write_target(items: List[Dict], output_path: str):',
-                '    pass',
-            ]
+    def _projected_fields(self) -> Optional[List[str]]:
+        """Source fields the rules read, or None if whole rows are needed.
+
+        A component query or a rule condition may reference any column, so
+        neither can be projected.
+        """
+        rules = self.mapping['rules']
+        if self.mapping.get('component') or any(rule.condition for rule in rules):
+            return None
+        return list(dict.fromkeys(rule.source_field for rule in rules if rule.source_field))
 
-    def _generate_component_db_setup(self) -> List[str]:
+    def _generate_component_db_setup(self, buf: List[str]) -> None:
         """Generate code to setup In-Memory Component DB."""
-        return [
+        buf.extend((
             '',
             '    # --- Component Preparation (In-Memory DB) ---',
             '    import sqlite3',
             '    conn = sqlite3.connect(":memory:")',
             '    cursor = conn.cursor()',
-        ]
+        ))
 
-    def _generate_main_function(self, target_type: str) -> List[str]:
+    def _generate_main_function(self, target_type: str, buf: List[str]) -> None:
         """Generate main execute_mapping function."""
-        lines = []
-        
         target_config = self.mapping['target']['config']
-        component_config = self.mapping.get('component', {}).get('config', {})
+        component_config = (self.mapping.get('component') or {}).get('config', {})
         
         # In the main function we accept **kwargs for the sources instead
         # For a single source, input_data is a string, for multiple it will be a dict
-        lines.extend([
+        buf.extend([
             '',
             '# Main Mapping Function',
             'def execute_mapping(inputs: dict, output_path: str) -> List[Dict]:',
@@ -704,60 +985,55 @@ class CodeGenerator:
         ])
         
         # Read all sources
+        fields = self._projected_fields()
+        columnar = self._is_columnar()
         for src in self.mapping['sources']:
             source_type = src['type'].upper()
             source_config = src['config']
             alias = src.get('alias', 'source1')
             
-            lines.append(f'    input_for_{alias} = inputs.get("{alias}")')
-            lines.append(f'    if not input_for_{alias}:')
-            lines.append(f'        pass # handle missing input gracefully if needed')
-            lines.append(f'    else:')
+            buf.append(f'    input_for_{alias} = inputs.get("{alias}")')
+            buf.append(f'    if not input_for_{alias}:')
+            buf.append(f'        pass # handle missing input gracefully if needed')
+            buf.append(f'    else:')
             
-            if source_type == 'CSV':
-                has_header = str(source_config.get('has_header', 'true')).capitalize()
-                lines.append(f'        sources_data["{alias}"] = read_source(input_for_{alias}, has_header={has_header})')
-            elif source_type == 'DB':
-                db_type = source_config.get('type', 'sqlite')
-                conn_str = source_config.get('connection_string', '')
-                query = source_config.get('query', 'SELECT * FROM table')
-                escaped_query = query.replace('\\', '\\\\').replace('"', '\\"')
-                lines.append(f'        sources_data["{alias}"] = read_db_source("{db_type}", "{conn_str}", """{escaped_query}""")')
-            elif source_type == 'EDI':
-                version = source_config.get('version', 'X12')
-                lines.append(f'        sources_data["{alias}"] = read_edi_source(input_for_{alias}, delimiter="{version}")')
-            elif source_type == 'JSON':
-                # Reusing existing generic reader for JSON (we should implement a real JSON reader, but simple for now)
-                lines.append(f'        with open(input_for_{alias}, "r") as f: sources_data["{alias}"] = json.load(f)')
+            if columnar:
+                source_call = _csv_columns_source_call
             else:
-                root_elem = source_config.get('root_element', 'Item')
-                lines.append(f'        sources_data["{alias}"] = read_source(input_for_{alias}, root_element="{root_elem}")')
+                source_call = _SOURCE_CALLS.get(source_type, _generic_source_call)
+            buf.append(f'        sources_data["{alias}"] = {source_call(alias, source_config, fields)}')
 
         # Insert component preparation block
-        if self.mapping.get('component'):
-            lines.extend(self._generate_component_db_setup())
+        if columnar:
+            self._generate_column_mapping(buf)
+        elif self.mapping.get('component'):
+            self._generate_component_db_setup(buf)
             # For each source, create a table and insert its items
             for src in self.mapping['sources']:
                 alias = src.get('alias', 'source1')
-                lines.extend([
-                    f'    if "{alias}" in sources_data and sources_data["{alias}"]:',
+                buf.extend([
+                    f'    items_{alias} = iter(sources_data.get("{alias}", ()))',
+                    f'    first_item = next(items_{alias}, None)',
+                    f'    if first_item is not None:',
                     f'        # Dynamically create table and insert data for alias {alias}',
-                    f'        first_item = sources_data["{alias}"][0]',
                     f'        columns = list(first_item.keys())',
                     f'        col_defs = ", ".join([f"{{c}} TEXT" for c in columns])',
                     f'        cursor.execute(f"CREATE TABLE {alias} ({{col_defs}})")',
                     f'        ',
                     f'        placeholders = ", ".join(["?" for _ in columns])',
-                    f'        insert_sql = f"INSERT INTO {alias} ({{", ".join(columns)}}) VALUES ({{placeholders}})"',
-                    f'        for item in sources_data["{alias}"]:',
-                    f'            cursor.execute(insert_sql, [str(item.get(c)) if item.get(c) is not None else None for c in columns])',
+                    f'        insert_sql = "INSERT INTO {alias} (" + ", ".join(columns) + ") VALUES (" + placeholders + ")"',
+                    f'        conn.execute("BEGIN")',
+                    f'        cursor.executemany(insert_sql, (',
+                    f'            [str(item.get(c)) if item.get(c) is not None else None for c in columns]',
+                    f'            for item in chain((first_item,), items_{alias})',
+                    f'        ))',
                     f'        conn.commit()'
                 ])
             
             # Execute Component Query
             comp_query = component_config.get('query', 'SELECT * FROM source1')
             escaped_comp_query = comp_query.replace('\\', '\\\\').replace('"', '\\"')
-            lines.extend([
+            buf.extend([
                 f'    ',
                 f'    # Execute Component query to produce final source items',
                 f'    cursor.execute("""{escaped_comp_query}""")',
@@ -768,49 +1044,41 @@ class CodeGenerator:
         else:
             # Backwards compatibility: if no component, just use the first source alias as source_items
             first_alias = self.mapping['sources'][0].get('alias', 'source1')
-            lines.append(f'')
-            lines.append(f'    source_items = sources_data.get("{first_alias}", [])')
+            buf.append(f'')
+            buf.append(f'    source_items = sources_data.get("{first_alias}", [])')
         
-        lines.extend([
-            '',
-            '    # Transform items',
-            '    output_items = []',
-        ])
-        
-        lines.append('    for source_item in source_items:')
-        lines.append('        output_item = {}')
-        
-        # Generate rules - all fields go into one output item
-        for rule in self.mapping['rules']:
-            lines.extend(self._generate_rule_processing(rule, indent=8))
-        
-        lines.append('        output_items.append(output_item)')
-        lines.append('')
+        if not columnar:
+            buf.extend([
+                '',
+                '    # Transform items',
+                '    output_items = [_map_row(source_item) for source_item in source_items]',
+                '',
+            ])
         
         # Write target
         if target_type == 'CSV':
-            lines.append('    write_target(output_items, output_path)')
+            buf.append('    write_target(output_items, output_path)')
         elif target_type == 'DB':
             db_type = target_config.get('type', 'sqlite')
             conn_str = target_config.get('connection_string', '')
             table = target_config.get('table', 'output')
-            lines.append(f'    write_db_target(output_items, "{db_type}", "{conn_str}", "{table}")')
+            buf.append(f'    write_db_target(output_items, "{db_type}", "{conn_str}", "{table}")')
         elif target_type == 'EDI':
             version = target_config.get('version', 'X12')
-            lines.append(f'    write_target(output_items, output_path, delimiter="{version}")')
+            buf.append(f'    write_target(output_items, output_path, delimiter="{version}")')
         elif target_type == 'JSON':
-            lines.append('    write_target(output_items, output_path)')
+            buf.append('    write_target(output_items, output_path)')
         else:
             root_elem = target_config.get('root_element', 'Root')
-            lines.append(f'    write_target(output_items, output_path, root_element="{root_elem}")')
+            buf.append(f'    write_target(output_items, output_path, root_element="{root_elem}")')
         
-        lines.extend([
+        buf.extend([
             '',
             '    return output_items',
         ])
         
         # Entry point updated for kwargs loading structure
-        lines.extend([
+        buf.extend([
             '',
             'if __name__ == "__main__":',
             '    import sys',
@@ -829,70 +1097,217 @@ class CodeGenerator:
             '    else:',
             '        print("Usage: python generated.py [alias1 input1 ...] <output>")',
         ])
-        
-        return lines
 
-    def _generate_rule_processing(self, rule: Dict, indent: int = 4) -> List[str]:
+    # Transforms that cannot raise on a non-None value are inlined as
+    # plain expressions; the rest keep transform_value's fall-back-to-input
+    # behaviour through an emitted try/except.
+    _INLINE_TRANSFORMS = {
+        'upper': 'str(v).upper()',
+        'lower': 'str(v).lower()',
+        'trim': 'str(v).strip()',
+        'str': 'str(v)',
+    }
+
+    _TYPE_MAP = {
+        'integer': 'int',
+        'int': 'int',
+        'string': 'str',
+        'str': 'str',
+        'decimal': 'float',  # Python uses float for decimals
+        'float': 'float',
+        'boolean': 'bool',
+        'bool': 'bool',
+    }
+
+    def _generate_row_mapper(self, buf: List[str]) -> None:
+        """Generate a straight-line _map_row function from the rule set."""
+        buf.extend((
+            '',
+            '# Row Mapping Function (specialized from RULES)',
+            'def _map_row(source_item: Dict) -> Dict:',
+            '    """Apply all mapping rules to a single source item."""',
+            '    output_item = {}',
+        ))
+        for rule in self.mapping['rules']:
+            self._generate_rule_processing(rule, buf, indent=4)
+        buf.append('    return output_item')
+
+    def _transform_expr(self, transform: str) -> Optional[tuple]:
+        """Resolve a transform call to (expression in v, may_raise), or None for a no-op."""
+        func_name = transform.split('(')[0]
+        args_str = transform[len(func_name)+1:-1]  # Extract args
+        if func_name in self._INLINE_TRANSFORMS:
+            return self._INLINE_TRANSFORMS[func_name], False
+        try:
+            args = ast.literal_eval(f'({args_str},)') if args_str.strip() else ()
+        except (ValueError, SyntaxError):
+            return f'transform_value(v, "{func_name}", {args_str})', False
+        if func_name in ('int', 'float'):
+            return f'{func_name}(v)', True
+        if func_name == 'format_number' and args:
+            # Known patterns become a direct format() call; others never apply
+            spec = _NUMBER_FORMAT_SPECS.get(args[0])
+            return (f'format(float(v), {spec!r})', True) if spec else None
+        if func_name == 'format_date' and args:
+            return f'format_date_func(v, {args[0]!r})', True
+        if func_name == 'substring' and args:
+            end = f'int({args[1]!r})' if len(args) > 1 else ''
+            return f'str(v)[int({args[0]!r}):{end}]', True
+        # Unknown names and argument-less formatters leave the value unchanged
+        return None
+
+    def _is_columnar(self) -> bool:
+        """Whether the mapping can run column-at-a-time instead of per row.
+
+        That needs a single CSV source whose needed fields are known up
+        front (no component, no conditions) and no LOOP rules.
+        """
+        sources = self.mapping['sources']
+        if len(sources) != 1 or sources[0]['type'].upper() != 'CSV':
+            return False
+        if self._projected_fields() is None:
+            return False
+        return not any(str(rule.transform or '').startswith('loop(') for rule in self.mapping['rules'])
+
+    def _generate_column_helpers(self, buf: List[str]) -> None:
+        """Generate helpers used by the column-wise mapping path."""
+        buf.extend((
+            '',
+            '# Column Mapping Helper',
+            'def _map_column_safe(fn, col: List) -> List:',
+            '    """Apply fn to each non-None value, keeping any value fn fails on."""',
+            '    out = []',
+            '    append = out.append',
+            '    for v in col:',
+            '        if v is not None:',
+            '            try:',
+            '                v = fn(v)',
+            '            except Exception:',
+            '                pass',
+            '        append(v)',
+            '    return out',
+        ))
+
+    def _generate_column_mapping(self, buf: List[str]) -> None:
+        """Generate the column-wise equivalent of _map_row over the source columns."""
+        alias = self.mapping['sources'][0].get('alias', 'source1')
+        buf.extend((
+            '',
+            f'    n_rows, source_columns = sources_data.get("{alias}", (0, {{}}))',
+            '    missing = [None] * n_rows',
+            '',
+            '    # Transform columns',
+            '    output_columns = {}',
+        ))
+        for rule in self.mapping['rules']:
+            if not rule.target_field:
+                continue
+            if rule.source_field:
+                buf.append(f'    col = source_columns.get("{rule.source_field}", missing)')
+            else:
+                buf.append('    col = missing')
+            if rule.default_value is not None:
+                buf.append(f'    col = [{rule.default_value!r} if v is None else v for v in col]')
+            transform = self._transform_expr(rule.transform) if rule.transform else None
+            if transform:
+                expr, may_raise = transform
+                if may_raise:
+                    buf.append(f'    col = _map_column_safe(lambda v: {expr}, col)')
+                else:
+                    buf.append(f'    col = [{expr} if v is not None else None for v in col]')
+            if rule.data_type:
+                python_type = self._TYPE_MAP.get(rule.data_type.lower(), rule.data_type)
+                buf.append(f'    col = [{python_type}(v) if v is not None else None for v in col]')
+            buf.append(f'    output_columns["{rule.target_field}"] = col')
+        buf.extend((
+            '',
+            '    # Zip columns back into output items',
+            '    if output_columns:',
+            '        keys = list(output_columns)',
+            '        output_items = [dict(zip(keys, row)) for row in zip(*output_columns.values())]',
+            '    else:',
+            '        output_items = [{} for _ in range(n_rows)]',
+            '',
+        ))
+
+    def _generate_rule_processing(self, rule: Rule, buf: List[str], indent: int = 4) -> None:
         """Generate code for processing a single mapping rule."""
-        lines = []
-        
-        if not rule.get('target_field'):
-            return lines
-        
-        source_var = f'source_item.get("{rule["source_field"]}")' if rule.get('source_field') else 'None'
-        value_expr = source_var
+        if not rule.target_field:
+            return
         
+        indent_str = ' ' * indent
+        if rule.condition:
+            buf.append(f'{indent_str}if {rule.condition}:')
+            indent_str += '    '
+
+        source_var = f'source_item.get("{rule.source_field}")' if rule.source_field else 'None'
+        buf.append(f'{indent_str}v = {source_var}')
+
         # Apply default value if provided
-        if rule.get('default_value') is not None:
-            default_val = repr(rule['default_value'])
-            value_expr = f'{source_var} if {source_var} is not None else {default_val}'
+        if rule.default_value is not None:
+            buf.append(f'{indent_str}if v is None:')
+            buf.append(f'{indent_str}    v = {rule.default_value!r}')
 
         # Apply transform
-        if rule.get('transform'):
-            func_name = rule['transform'].split('(')[0]
-            args_str = rule['transform'][len(func_name)+1:-1]  # Extract args
-            value_expr = f'transform_value({value_expr}, "{func_name}", {args_str})'
-        
+        transform = self._transform_expr(rule.transform) if rule.transform else None
+        if transform:
+            expr, may_raise = transform
+            buf.append(f'{indent_str}if v is not None:')
+            if may_raise:
+                buf.extend([
+                    f'{indent_str}    try:',
+                    f'{indent_str}        v = {expr}',
+                    f'{indent_str}    except Exception:',
+                    f'{indent_str}        pass',
+                ])
+            else:
+                buf.append(f'{indent_str}    v = {expr}')
+
         # Apply data type - map to Python built-ins
-        if rule.get('data_type'):
-            type_map = {
-                'integer': 'int',
-                'int': 'int',
-                'string': 'str',
-                'str': 'str',
-                'decimal': 'float',  # Python uses float for decimals
-                'float': 'float',
-                'boolean': 'bool',
-                'bool': 'bool',
-            }
-            python_type = type_map.get(rule['data_type'].lower(), rule['data_type'])
-            value_expr = f'{python_type}({value_expr}) if {value_expr} is not None else None'
-        
-        # Generate assignment with proper indentation
-        indent_str = ' ' * indent
-        target_field = rule['target_field']
-        
-        if rule.get('condition'):
-            lines.append(f'{indent_str}if {rule["condition"]}:')
-            lines.append(f'{indent_str}    output_item["{target_field}"] = {value_expr}')
-        else:
-            lines.append(f'{indent_str}output_item["{target_field}"] = {value_expr}')
-        
-        return lines
+        if rule.data_type:
+            python_type = self._TYPE_MAP.get(rule.data_type.lower(), rule.data_type)
+            buf.append(f'{indent_str}if v is not None:')
+            buf.append(f'{indent_str}    v = {python_type}(v)')
+
+        buf.append(f'{indent_str}output_item["{rule.target_field}"] = v')
+
+@functools.lru_cache(maxsize=64)
+def _parse_cached(text: str) -> Dict:
+    """Parse DML text, memoized on the text itself."""
+    return Parser(text).parse()
+
+
+@functools.lru_cache(maxsize=64)
+def _generate_cached(mapping_key: str) -> str:
+    """Generate code for a mapping serialized by generate_python_code."""
+    return CodeGenerator(json.loads(mapping_key)).generate()
+
+
+def _copy_containers(value: Any) -> Any:
+    """Copy the dicts and lists of a parsed mapping; anything else (frozen Rules, strings) is shared."""
+    if isinstance(value, dict):
+        return {key: _copy_containers(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_containers(item) for item in value]
+    return value
 
 
 def parse_dml_file(filepath: str) -> Dict:
     """Parse a DML mapping file."""
     with open(filepath, 'r', encoding='utf-8') as f:
         content = f.read()
-    parser = Parser(content)
-    return parser.parse()
+    # Callers own (and may mutate) the containers; the Rules are shared with the cache.
+    return _copy_containers(_parse_cached(content))
 
 
 def generate_python_code(mapping: Dict) -> str:
     """Generate Python code from mapping definition."""
-    generator = CodeGenerator(mapping)
-    return generator.generate()
+    try:
+        mapping_key = json.dumps(mapping, sort_keys=True, default=dataclasses.asdict)
+    except TypeError:
+        # Not JSON-serializable (e.g. hand-built with custom objects): no caching
+        return CodeGenerator(mapping).generate()
+    return _generate_cached(mapping_key)
 
 
 def compile_mapping(input_file: str, output_file: str) -> Dict:
@@ -3,13 +3,17 @@ Parser for the Data Mapping Language (DML)
 Parses mapping files and generates executable Python code.
 """
 
+import io
 import re
 import os
-from dataclasses import dataclass, field
-from typing import Optional, List, Dict, Any, Union
+import functools
+import itertools
+import collections
+from dataclasses import dataclass, field, fields, is_dataclass, replace
+from typing import Optional, List, Dict, Any, Iterator, Tuple, Union
 
 
-@dataclass
+@dataclass(slots=True)
 class SourceConfig:
     """Configuration for data source."""
     type: str  # XML, CSV, DB, EDI, JSON
@@ -17,33 +21,33 @@ class SourceConfig:
     config: Dict[str, Any] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True)
 class TargetConfig:
     """Configuration for data target."""
     type: str  # XML, CSV, DB, EDI, JSON
     config: Dict[str, Any] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True)
 class ComponentConfig:
     """Configuration for intermediate component."""
     type: str  # DB
     config: Dict[str, Any] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class MappingRule:
     """A single mapping rule."""
     source_field: str
     target_field: str
-    transform: Optional[str] = None
+    transform: Optional[Tuple[str, Tuple[Any, ...]]] = None  # (func_name, args)
     condition: Optional[str] = None
     default_value: Optional[Any] = None
     data_type: Optional[str] = None
     is_dynamic_target: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class ObjectBlock:
     """Nested object mapping block."""
     prefix: str
@@ -51,7 +55,7 @@ class ObjectBlock:
     is_dynamic_prefix: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class IfElseBlock:
     """Conditional block with IF and optional ELSE."""
     condition: str
@@ -59,7 +63,7 @@ class IfElseBlock:
     else_rules: List[Any] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class LoopBlock:
     """Iteration block for collections."""
     collection: str
@@ -68,19 +72,19 @@ class LoopBlock:
     rules: List[Any] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class BreakStatement:
     """BREAK loop control."""
     pass
 
 
-@dataclass
+@dataclass(slots=True)
 class ContinueStatement:
     """CONTINUE loop control."""
     pass
 
 
-@dataclass
+@dataclass(slots=True)
 class TryCatchBlock:
     """Error handling block with TRY and CATCH."""
     try_rules: List[Any]
@@ -88,7 +92,7 @@ class TryCatchBlock:
     error_var: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class SwitchCaseBlock:
     """Multi-condition dispatch block with SWITCH and CASE."""
     expression: str
@@ -96,14 +100,14 @@ class SwitchCaseBlock:
     default_rules: List[Any] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class AggregateBlock:
     """Grouping and aggregation configuration."""
     group_by: List[str] = field(default_factory=list)
     rules: List[MappingRule] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class ValidationRule:
     """A data validation rule."""
     field: str
@@ -112,7 +116,7 @@ class ValidationRule:
     message: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class VariableDefinition:
     """A user-defined variable or constant."""
     name: str
@@ -120,7 +124,7 @@ class VariableDefinition:
     is_const: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class MacroDefinition:
     """A reusable code snippet (macro)."""
     name: str
@@ -128,21 +132,21 @@ class MacroDefinition:
     rules: List[Any]
 
 
-@dataclass
+@dataclass(slots=True)
 class MacroCall:
     """A call to a defined macro."""
     name: str
     args: List[Any]
 
 
-@dataclass
+@dataclass(slots=True)
 class CleanseBlock:
     """Automatic data cleansing configuration."""
     trim: bool = False
     case: Optional[str] = None # UPPER, LOWER
 
 
-@dataclass
+@dataclass(slots=True)
 class Mapping:
     """Complete mapping definition."""
     name: str
@@ -160,63 +164,40 @@ class Mapping:
     rules: List[Union[MappingRule, IfElseBlock, TryCatchBlock, SwitchCaseBlock, LoopBlock, BreakStatement, ContinueStatement, MacroCall, ObjectBlock]] = field(default_factory=list)
 
 
+# Token-kind groups used by the tokenizer and parser guards.
+_SKIPPED = frozenset({'WS', 'COMMENT', 'BLOCK_COMMENT'})
+_CONFIG_TYPES = frozenset({'XML', 'CSV', 'DB', 'EDI', 'JSON', 'IDENT'})
+_FIELD_START = frozenset({'STRING', 'IDENT', 'SLASHPATH'})
+_NAME_VALUE = frozenset({'IDENT', 'SLASHPATH'})
+_FUNCTION_NAMES = frozenset({'IDENT', 'SUM', 'AVG', 'COUNT', 'MIN', 'MAX', 'RANK', 'ROW_NUMBER', 'TRIM'})
+_CONDITION_STOP = frozenset({
+    'LBRACE', 'RBRACE', 'RPAREN', 'TRANSFORM', 'DEFAULT', 'AS', 'MESSAGE', 'FORMAT', 'DISTINCT',
+    'RULES', 'SOURCE', 'TARGET', 'COMPONENT', 'CLEANSE', 'VAR', 'CONST', 'MACRO', 'SELECT', 'FILTER',
+})
+_VALIDATION_STOP = frozenset({
+    'RBRACE', 'SOURCE', 'TARGET', 'RULES', 'VALIDATE', 'CLEANSE', 'AGGREGATE', 'MAP', 'IF', 'TRY',
+    'SWITCH', 'DISTINCT', 'VAR', 'CONST', 'MACRO', 'SELECT', 'FILTER',
+})
+
+
 class Tokenizer:
     """Tokenizes the mapping language input."""
     
+    # Keywords are scanned as IDENT and promoted by a case-insensitive
+    # lookup, so none of the patterns below need re.IGNORECASE.
+    _KEYWORDS = {name: name for name in (
+        'MAPPING', 'SOURCE', 'TARGET', 'RULES', 'XML', 'CSV', 'DB', 'EDI', 'JSON',
+        'COMPONENT', 'TRY', 'CATCH', 'SWITCH', 'CASE', 'IF', 'ELSE', 'VALIDATE',
+        'FORMAT', 'MESSAGE', 'CLEANSE', 'TRIM', 'UNIQUE', 'DISTINCT', 'AGGREGATE',
+        'GROUP', 'BY', 'SUM', 'AVG', 'COUNT', 'MIN', 'MAX', 'RANK', 'ROW_NUMBER',
+        'TRANSFORM', 'DEFAULT', 'AS', 'MAP', 'LOOP', 'VAR', 'CONST', 'MACRO', 'FILTER',
+        'SELECT', 'OBJECT', 'INCLUDE', 'IMPORT', 'BREAK', 'CONTINUE', 'WHEN', 'THEN',
+    )}
+
     TOKENS = [
         ('WS', r'\s+'),
         ('BLOCK_COMMENT', r'/\*[\s\S]*?\*/'),
         ('COMMENT', r'#.*$'),
-        ('MAPPING', r'[Mm][Aa][Pp][Pp][Ii][Nn][Gg]\b'),
-        ('SOURCE', r'[Ss][Oo][Uu][Rr][Cc][Ee]\b'),
-        ('TARGET', r'[Tt][Aa][Rr][Gg][Ee][Tt]\b'),
-        ('RULES', r'[Rr][Uu][Ll][Ee][Ss]\b'),
-        ('XML', r'[Xx][Mm][Ll]\b'),
-        ('CSV', r'[Cc][Ss][Vv]\b'),
-        ('DB', r'[Dd][Bb]\b'),
-        ('EDI', r'[Ee][Dd][Ii]\b'),
-        ('JSON', r'[Jj][Ss][Oo][Nn]\b'),
-        ('COMPONENT', r'[Cc][Oo][Mm][Pp][Oo][Nn][Ee][Nn][Tt]\b'),
-        ('TRY', r'[Tt][Rr][Yy]\b'),
-        ('CATCH', r'[Cc][Aa][Tt][Cc][Hh]\b'),
-        ('SWITCH', r'[Ss][Ww][Ii][Tt][Cc][Hh]\b'),
-        ('CASE', r'[Cc][Aa][Ss][Ee]\b'),
-        ('IF', r'[Ii][Ff]\b'),
-        ('ELSE', r'[Ee][Ll][Ss][Ee]\b'),
-        ('VALIDATE', r'[Vv][Aa][Ll][Ii][Dd][Aa][Tt][Ee]\b'),
-        ('FORMAT', r'[Ff][Oo][Rr][Mm][Aa][Tt]\b'),
-        ('MESSAGE', r'[Mm][Ee][Ss][Ss][Aa][Gg][Ee]\b'),
-        ('CLEANSE', r'[Cc][Ll][Ee][Aa][Nn][Ss][Ee]\b'),
-        ('TRIM', r'[Tt][Rr][Ii][Mm]\b'),
-        ('UNIQUE', r'[Uu][Nn][Ii][Qq][Uu][Ee]\b'),
-        ('DISTINCT', r'[Dd][Ii][Ss][Tt][Ii][Nn][Cc][Tt]\b'),
-        ('AGGREGATE', r'[Aa][Gg][Gg][Rr][Ee][Gg][Aa][Tt][Ee]\b'),
-        ('GROUP', r'[Gg][Rr][Oo][Uu][Pp]\b'),
-        ('BY', r'[Bb][Yy]\b'),
-        ('SUM', r'[Ss][Uu][Mm]\b'),
-        ('AVG', r'[Aa][Vv][Gg]\b'),
-        ('COUNT', r'[Cc][Oo][Uu][Nn][Tt]\b'),
-        ('MIN', r'[Mm][Ii][Nn]\b'),
-        ('MAX', r'[Mm][Aa][Xx]\b'),
-        ('RANK', r'[Rr][Aa][Nn][Kk]\b'),
-        ('ROW_NUMBER', r'[Rr][Oo][Ww]_[Nn][Uu][Mm][Bb][Ee][Rr]\b'),
-        ('TRANSFORM', r'[Tt][Rr][Aa][Nn][Ss][Ff][Oo][Rr][Mm]\b'),
-        ('DEFAULT', r'[Dd][Ee][Ff][Aa][Uu][Ll][Tt]\b'),
-        ('AS', r'[Aa][Ss]\b'),
-        ('MAP', r'[Mm][Aa][Pp]\b'),
-        ('LOOP', r'[Ll][Oo][Oo][Pp]\b'),
-        ('VAR', r'[Vv][Aa][Rr]\b'),
-        ('CONST', r'[Cc][Oo][Nn][Ss][Tt]\b'),
-        ('MACRO', r'[Mm][Aa][Cc][Rr][Oo]\b'),
-        ('FILTER', r'[Ff][Ii][Ll][Tt][Ee][Rr]\b'),
-        ('SELECT', r'[Ss][Ee][Ll][Ee][Cc][Tt]\b'),
-        ('OBJECT', r'[Oo][Bb][Jj][Ee][Cc][Tt]\b'),
-        ('INCLUDE', r'[Ii][Nn][Cc][Ll][Uu][Dd][Ee]\b'),
-        ('IMPORT', r'[Ii][Mm][Pp][Oo][Rr][Tt]\b'),
-        ('BREAK', r'[Bb][Rr][Ee][Aa][Kk]\b'),
-        ('CONTINUE', r'[Cc][Oo][Nn][Tt][Ii][Nn][Uu][Ee]\b'),
-        ('WHEN', r'[Ww][Hh][Ee][Nn]\b'),
-        ('THEN', r'[Tt][Hh][Ee][Nn]\b'),
         ('LBRACE', r'\{'),
         ('RBRACE', r'\}'),
         ('LPAREN', r'\('),
@@ -226,43 +207,54 @@ class Tokenizer:
         ('ARROW', r'->'),
         ('COMMA', r','),
         ('COLON', r':'),
-        ('GT', r'>'),
-        ('LT', r'<'),
+        # Multi-character operators precede their one-character prefixes so
+        # ">=" is not scanned as GT followed by ASSIGN.
         ('GE', r'>='),
         ('LE', r'<='),
         ('EQ', r'=='),
-        ('ASSIGN', r'='),
         ('NE', r'!='),
+        ('GT', r'>'),
+        ('LT', r'<'),
+        ('ASSIGN', r'='),
         ('PLUS', r'\+'),
-        ('MINUS', r'-'),
         ('STAR', r'\*'),
         ('SLASH', r'/'),
+        # NUMBER before MINUS so a signed literal like -3 stays one token.
         ('NUMBER', r'-?\d+(\.\d+)?'),
+        ('MINUS', r'-'),
         ('STRING', r'"[^"]*"|\'[^\']*\''),
         ('SLASHPATH', r'[a-zA-Z0-9_/-]+/[a-zA-Z0-9_/]*'),
         ('IDENT', r'[a-zA-Z_][a-zA-Z0-9_]*'),
     ]
+
+    # All patterns fused into one alternation.  Alternatives are tried in
+    # TOKENS order, so the first listed pattern still wins at each position;
+    # MISMATCH catches any character no token accepts.
+    _MASTER = re.compile(
+        '|'.join(f'(?P<{name}>{pattern})' for name, pattern in TOKENS) + r'|(?P<MISMATCH>.)',
+        re.MULTILINE,
+    )
     
     def __init__(self, text: str):
         self.text = text
         self.tokens: List[tuple] = []
-        
+
+    def itokens(self) -> Iterator[tuple]:
+        """Lazily yield (kind, value) tokens, dropping whitespace and comments."""
+        keywords = self._KEYWORDS
+        for match in self._MASTER.finditer(self.text):
+            token_type = match.lastgroup
+            if token_type == 'MISMATCH':
+                raise SyntaxError(f"Unexpected character at position {match.start()}: {match.group()}")
+            if token_type not in _SKIPPED:
+                value = match.group()
+                if token_type == 'IDENT':
+                    token_type = keywords.get(value.upper(), 'IDENT')
+                yield (token_type, value)
+
     def tokenize(self) -> List[tuple]:
         """Convert input text into tokens."""
-        pos = 0
-        while pos < len(self.text):
-            match = None
-            for token_type, pattern in self.TOKENS:
-                regex = re.compile(pattern, re.MULTILINE | re.IGNORECASE)
-                match = regex.match(self.text, pos)
-                if match:
-                    value = match.group(0)
-                    if token_type not in ('WS', 'COMMENT', 'BLOCK_COMMENT'):
-                        self.tokens.append((token_type, value))
-                    pos = match.end()
-                    break
-            if not match:
-                raise SyntaxError(f"Unexpected character at position {pos}: {self.text[pos]}")
+        self.tokens = list(self.itokens())
         return self.tokens
 
 
@@ -271,33 +263,44 @@ class Parser:
     
     def __init__(self, text: str):
         self.tokenizer = Tokenizer(text)
-        self.tokens = []
-        self.pos = 0
+        # Tokens are pulled from the tokenizer on demand; _buf holds the
+        # lookahead the grammar has asked for so far (at most two tokens).
+        self._stream: Iterator[tuple] = iter(())
+        self._buf: collections.deque = collections.deque()
         
     def parse(self) -> Mapping:
         """Parse the entire mapping definition."""
-        self.tokens = self.tokenizer.tokenize()
-        self.pos = 0
+        self._stream = self.tokenizer.itokens()
+        self._buf.clear()
         return self.parse_mapping()
+
+    def _fill(self, n: int) -> bool:
+        """Pull tokens until n are buffered; False if the input runs out first."""
+        buf, stream = self._buf, self._stream
+        while len(buf) < n:
+            token = next(stream, None)
+            if token is None:
+                return False
+            buf.append(token)
+        return True
     
     def current_token(self) -> Optional[tuple]:
         """Get current token."""
-        if self.pos < len(self.tokens):
-            return self.tokens[self.pos]
+        if self._buf or self._fill(1):
+            return self._buf[0]
         return None
     
     def peek_token(self, offset: int = 0) -> Optional[tuple]:
         """Peek at token at offset."""
-        idx = self.pos + offset
-        if idx < len(self.tokens):
-            return self.tokens[idx]
+        if self._fill(offset + 1):
+            return self._buf[offset]
         return None
     
     def advance(self) -> Optional[tuple]:
         """Advance to next token and return current."""
         token = self.current_token()
         if token:
-            self.pos += 1
+            self._buf.popleft()
         return token
     
     def expect(self, token_type: str) -> tuple:
@@ -310,21 +313,20 @@ class Parser:
     
     def match(self, token_type: str) -> Optional[tuple]:
         """Match and consume token if type matches."""
-        if self.current_token() and self.current_token()[0] == token_type:
-            return self.advance()
+        token = self.current_token()
+        if token and token[0] == token_type:
+            self._buf.popleft()
+            return token
         return None
     
     def skip_whitespace(self):
-        """Skip whitespace and comments."""
-        while self.current_token() and self.current_token()[0] in ('WS', 'COMMENT'):
-            self.advance()
+        """Skip whitespace and comments (a no-op: the tokenizer already drops them)."""
     
     def parse_mapping(self) -> Mapping:
         """Parse MAPPING definition."""
         self.expect('MAPPING')
         name = self.expect('IDENT')[1]
         
-        self.skip_whitespace()
         self.expect('LBRACE')
         
         sources = []
@@ -340,44 +342,44 @@ class Parser:
         output_filter = None
         rules = []
         
-        while self.current_token() and self.current_token()[0] != 'RBRACE':
-            self.skip_whitespace()
+        while True:
             token = self.current_token()
-            if not token: break
+            if not token or token[0] == 'RBRACE': break
             
-            if self.match('SOURCE'):
+            kind = token[0]
+            self._buf.popleft()
+            if kind == 'SOURCE':
                 res = self.parse_source_target()
                 sources.append(SourceConfig(type=res['type'], alias=res['alias'], config=res['config']))
-            elif self.match('TARGET'):
+            elif kind == 'TARGET':
                 res = self.parse_source_target()
                 target = TargetConfig(type=res['type'], config=res['config'])
-            elif self.match('COMPONENT'):
+            elif kind == 'COMPONENT':
                 res = self.parse_source_target()
                 component = ComponentConfig(type=res['type'], config=res['config'])
-            elif self.match('AGGREGATE'):
+            elif kind == 'AGGREGATE':
                 aggregate = self.parse_aggregate()
-            elif self.match('CLEANSE'):
+            elif kind == 'CLEANSE':
                 cleanse = self.parse_cleanse()
-            elif self.match('VAR') or self.match('CONST'):
-                is_const = token[0] == 'CONST'
-                variables.append(self.parse_variable(is_const))
-            elif self.match('MACRO'):
+            elif kind == 'VAR' or kind == 'CONST':
+                variables.append(self.parse_variable(kind == 'CONST'))
+            elif kind == 'MACRO':
                 macro = self.parse_macro_definition()
                 macros[macro.name] = macro
-            elif self.match('SELECT'):
+            elif kind == 'SELECT':
                 input_filter = self.parse_condition()
-            elif self.match('FILTER'):
+            elif kind == 'FILTER':
                 output_filter = self.parse_condition()
-            elif self.match('INCLUDE') or self.match('IMPORT'):
+            elif kind == 'INCLUDE' or kind == 'IMPORT':
                 self.handle_include()
-            elif self.match('VALIDATE'):
+            elif kind == 'VALIDATE':
                 validations.append(self.parse_validation())
-            elif self.match('DISTINCT'):
+            elif kind == 'DISTINCT':
                 distinct = True
-            elif self.match('RULES'):
+            elif kind == 'RULES':
                 rules = self.parse_rules()
             else:
-                raise SyntaxError(f"Unexpected token in mapping: {self.current_token()}")
+                raise SyntaxError(f"Unexpected token in mapping: {token}")
         
         self.expect('RBRACE')
         
@@ -400,28 +402,23 @@ class Parser:
     def parse_variable(self, is_const: bool) -> VariableDefinition:
         """Parse VAR name = value or CONST name = value."""
         name = self.expect('IDENT')[1]
-        self.skip_whitespace()
         # Accept '=' or ':'
         if self.current_token() and self.current_token()[0] in ('ASSIGN', 'COLON'):
             self.advance()
         else:
             self.expect('ASSIGN')
-        self.skip_whitespace()
         value = self.parse_value()
         return VariableDefinition(name=name, value=value, is_const=is_const)
 
     def parse_macro_definition(self) -> MacroDefinition:
         """Parse MACRO name(p1, p2) { rules }."""
         name = self.expect('IDENT')[1]
-        self.skip_whitespace()
         self.expect('LPAREN')
         params = []
         while self.current_token() and self.current_token()[0] != 'RPAREN':
             params.append(self.expect('IDENT')[1])
-            self.skip_whitespace()
             if self.match('COMMA'): pass
         self.expect('RPAREN')
-        self.skip_whitespace()
         rules = self.parse_rules()
         return MacroDefinition(name=name, params=params, rules=rules)
 
@@ -437,50 +434,43 @@ class Parser:
             with open(file_path, 'r') as f:
                 content = f.read()
             # Tokenize included file
-            included_tokens = Tokenizer(content).tokenize()
-            # Insert tokens into current stream
-            self.tokens[self.pos:self.pos] = included_tokens
+            included_tokens = Tokenizer(content).itokens()
+            # Splice them in ahead of whatever is still buffered
+            self._stream = itertools.chain(included_tokens, tuple(self._buf), self._stream)
+            self._buf.clear()
         else:
             print(f"Warning: Included file not found: {file_path}")
 
     def parse_aggregate(self) -> AggregateBlock:
         """Parse AGGREGATE { GROUP BY f1, f2 RULES { ... } } block."""
-        self.skip_whitespace()
         self.expect('LBRACE')
         
         group_by = []
         rules = []
         
         while self.current_token() and self.current_token()[0] != 'RBRACE':
-            self.skip_whitespace()
             if self.match('GROUP'):
                 self.expect('BY')
                 while True:
-                    self.skip_whitespace()
                     group_by.append(self.expect('IDENT')[1])
-                    self.skip_whitespace()
                     if not self.match('COMMA'):
                         break
             elif self.match('RULES'):
                 rules = self.parse_rules()
             else:
                 self.advance()
-            self.skip_whitespace()
             
         self.expect('RBRACE')
         return AggregateBlock(group_by=group_by, rules=rules)
 
     def parse_cleanse(self) -> CleanseBlock:
         """Parse CLEANSE { TRIM true, CASE "UPPER" } block."""
-        self.skip_whitespace()
         self.expect('LBRACE')
         cleanse = CleanseBlock()
         while self.current_token() and self.current_token()[0] != 'RBRACE':
-            self.skip_whitespace()
             token = self.advance()
             if not token: break
             key = token[1].upper()
-            self.skip_whitespace()
             if key == 'TRIM':
                 val = self.parse_value()
                 cleanse.trim = str(val).lower() == 'true'
@@ -490,7 +480,6 @@ class Parser:
                     val = val[1:-1]
                 cleanse.case = val.upper()
             if self.match('COMMA'): pass
-            self.skip_whitespace()
         self.expect('RBRACE')
         return cleanse
 
@@ -501,8 +490,7 @@ class Parser:
         cond = None
         msg = None
         
-        while self.current_token() and self.current_token()[0] not in ('RBRACE', 'SOURCE', 'TARGET', 'RULES', 'VALIDATE', 'CLEANSE', 'AGGREGATE', 'MAP', 'IF', 'TRY', 'SWITCH', 'DISTINCT', 'VAR', 'CONST', 'MACRO', 'SELECT', 'FILTER'):
-            self.skip_whitespace()
+        while self.current_token() and self.current_token()[0] not in _VALIDATION_STOP:
             if self.match('FORMAT'):
                 fmt = self.parse_value()
                 if isinstance(fmt, str) and (fmt.startswith('"') or fmt.startswith("'")):
@@ -523,35 +511,31 @@ class Parser:
         if not type_token:
             raise SyntaxError("Expected configuration type")
             
-        if type_token[0] in ('XML', 'CSV', 'DB', 'EDI', 'JSON', 'IDENT'):
+        if type_token[0] in _CONFIG_TYPES:
             config_type = type_token[1].upper()
             self.advance()
         else:
             raise SyntaxError(f"Unexpected token for configuration type: {type_token}")
         
-        self.skip_whitespace()
         alias = None
         if self.match('AS'):
-            self.skip_whitespace()
             alias = self.expect('IDENT')[1]
-            self.skip_whitespace()
             
         self.expect('LBRACE')
         config = {}
-        while self.current_token() and self.current_token()[0] != 'RBRACE':
-            self.skip_whitespace()
-            key_token = self.advance()
+        while True:
+            key_token = self.current_token()
+            if not key_token or key_token[0] == 'RBRACE': break
+            self._buf.popleft()
             key = key_token[1]
-            self.skip_whitespace()
             self.expect('COLON')
-            self.skip_whitespace()
             value = self.parse_value()
             if isinstance(value, str) and (value.startswith('"') or value.startswith("'")):
                 value = value[1:-1]
             config[key] = value
-            self.skip_whitespace()
-            if self.current_token() and self.current_token()[0] == 'COMMA':
-                self.advance()
+            token = self.current_token()
+            if token and token[0] == 'COMMA':
+                self._buf.popleft()
         
         self.expect('RBRACE')
         return {'type': config_type, 'alias': alias, 'config': config}
@@ -567,7 +551,7 @@ class Parser:
             self.advance()
             if '.' in token[1]: return float(token[1])
             return int(token[1])
-        elif token[0] in ('IDENT', 'SLASHPATH'):
+        elif token[0] in _NAME_VALUE:
             self.advance()
             return token[1]
         return None
@@ -576,9 +560,11 @@ class Parser:
         """Parse mapping rules."""
         self.expect('LBRACE')
         rules = []
-        while self.current_token() and self.current_token()[0] != 'RBRACE':
-            self.skip_whitespace()
-            if self.match('OBJECT'):
+        while True:
+            token = self.current_token()
+            if not token or token[0] == 'RBRACE': break
+            if token[0] == 'OBJECT':
+                self._buf.popleft()
                 rules.append(self.parse_object_block())
                 continue
             rule = self.parse_rule()
@@ -589,7 +575,6 @@ class Parser:
     
     def parse_rule(self) -> Any:
         """Parse a single mapping rule or control flow block."""
-        self.skip_whitespace()
         token = self.current_token()
         if not token: return None
         
@@ -600,7 +585,6 @@ class Parser:
             args = []
             while self.current_token() and self.current_token()[0] != 'RPAREN':
                 args.append(self.parse_value())
-                self.skip_whitespace()
                 if self.match('COMMA'): pass
             self.expect('RPAREN')
             return MacroCall(name=name, args=args)
@@ -616,21 +600,17 @@ class Parser:
         if self.match('SWITCH'): return self.parse_switch_case_block()
         if not self.match('MAP'): return None
         
-        source_fields = []
-        while True:
-            self.skip_whitespace()
-            token = self.current_token()
-            if token and token[0] in ('STRING', 'IDENT', 'SLASHPATH'):
-                source_fields.append(self.parse_value())
-            elif token and token[0] == 'NULL':
-                self.advance()
-                source_fields.append(None)
-            else: break
-            if not self.match('COMMA'): break
+        source_field = ''
+        token = self.current_token()
+        if token and token[0] in _FIELD_START:
+            source_field = self.parse_value()
+            # Only the first field is mapped; further comma-separated ones are skipped.
+            while self.match('COMMA'):
+                token = self.current_token()
+                if not token or token[0] not in _FIELD_START: break
+                self._buf.popleft()
         
-        self.skip_whitespace()
         self.expect('ARROW')
-        self.skip_whitespace()
         
         target_field = None
         is_dynamic_target = False
@@ -640,7 +620,7 @@ class Parser:
             target_field = self.parse_condition()
             self.expect('RPAREN')
             is_dynamic_target = True
-        elif token and token[0] in ('STRING', 'IDENT', 'SLASHPATH'):
+        elif token and token[0] in _FIELD_START:
             target_field = self.parse_value()
         
         transform = None
@@ -649,7 +629,6 @@ class Parser:
         data_type = None
         
         while True:
-            self.skip_whitespace()
             token = self.current_token()
             if not token: break
             if token[0] == 'TRANSFORM':
@@ -667,7 +646,7 @@ class Parser:
             else: break
         
         return MappingRule(
-            source_field=source_fields[0] if source_fields else '',
+            source_field=source_field,
             target_field=target_field or '',
             transform=transform,
             condition=condition,
@@ -676,48 +655,39 @@ class Parser:
             is_dynamic_target=is_dynamic_target
         )
     
-    def parse_function_call(self) -> str:
-        """Parse a function call."""
+    def parse_function_call(self) -> Tuple[str, Tuple[Any, ...]]:
+        """Parse a function call into (func_name, args)."""
         token = self.current_token()
-        if token and token[0] in ('IDENT', 'SUM', 'AVG', 'COUNT', 'MIN', 'MAX', 'RANK', 'ROW_NUMBER', 'TRIM'):
+        if token and token[0] in _FUNCTION_NAMES:
             func_name = token[1]
             self.advance()
         else:
             func_name = self.expect('IDENT')[1]
-        self.skip_whitespace()
         self.expect('LPAREN')
         args = []
         while self.current_token() and self.current_token()[0] != 'RPAREN':
             arg = self.parse_value()
             if arg is not None: args.append(arg)
-            self.skip_whitespace()
             if self.current_token() and self.current_token()[0] == 'COMMA':
                 self.advance()
         self.expect('RPAREN')
-        return f"{func_name}({', '.join(repr(a) for a in args)})"
+        return func_name, tuple(args)
     
     def parse_if_else_block(self) -> IfElseBlock:
         """Parse IF condition { rules } [ELSE { rules }] block."""
         condition = self.parse_condition()
-        self.skip_whitespace()
         self.expect('LBRACE')
         if_rules = []
         while self.current_token() and self.current_token()[0] != 'RBRACE':
-            self.skip_whitespace()
             rule = self.parse_rule()
             if rule: if_rules.append(rule)
-            self.skip_whitespace()
         self.expect('RBRACE')
         else_rules = []
-        self.skip_whitespace()
         if self.match('ELSE'):
-            self.skip_whitespace()
             if self.match('LBRACE'):
                 while self.current_token() and self.current_token()[0] != 'RBRACE':
-                    self.skip_whitespace()
                     rule = self.parse_rule()
                     if rule: else_rules.append(rule)
-                    self.skip_whitespace()
                 self.expect('RBRACE')
             else:
                 rule = self.parse_rule()
@@ -726,81 +696,66 @@ class Parser:
 
     def parse_try_catch_block(self) -> TryCatchBlock:
         """Parse TRY { rules } CATCH [AS error] { rules } block."""
-        self.skip_whitespace()
         self.expect('LBRACE')
         try_rules = []
         while self.current_token() and self.current_token()[0] != 'RBRACE':
-            self.skip_whitespace()
             rule = self.parse_rule()
             if rule: try_rules.append(rule)
-            self.skip_whitespace()
         self.expect('RBRACE')
-        self.skip_whitespace()
         self.expect('CATCH')
         error_var = None
         if self.match('AS'): error_var = self.expect('IDENT')[1]
-        self.skip_whitespace()
         self.expect('LBRACE')
         catch_rules = []
         while self.current_token() and self.current_token()[0] != 'RBRACE':
-            self.skip_whitespace()
             rule = self.parse_rule()
             if rule: catch_rules.append(rule)
-            self.skip_whitespace()
         self.expect('RBRACE')
         return TryCatchBlock(try_rules=try_rules, catch_rules=catch_rules, error_var=error_var)
 
     def parse_switch_case_block(self) -> SwitchCaseBlock:
         """Parse SWITCH expression { CASE value: { rules } DEFAULT: { rules } } block."""
-        self.skip_whitespace()
         expr_token = self.advance()
         expression = expr_token[1] if expr_token else ""
-        self.skip_whitespace()
         self.expect('LBRACE')
         cases = {}
         default_rules = []
         while self.current_token() and self.current_token()[0] != 'RBRACE':
-            self.skip_whitespace()
             if self.match('CASE'):
                 val = self.parse_value()
                 if isinstance(val, str) and (val.startswith('"') or val.startswith("'")):
                     val = val[1:-1]
                 self.expect('COLON')
-                self.skip_whitespace()
                 self.expect('LBRACE')
                 rules = []
                 while self.current_token() and self.current_token()[0] != 'RBRACE':
                     rule = self.parse_rule()
                     if rule: rules.append(rule)
-                    self.skip_whitespace()
                 self.expect('RBRACE')
                 cases[str(val)] = rules
             elif self.match('DEFAULT'):
                 self.expect('COLON')
-                self.skip_whitespace()
                 self.expect('LBRACE')
                 while self.current_token() and self.current_token()[0] != 'RBRACE':
                     rule = self.parse_rule()
                     if rule: default_rules.append(rule)
-                    self.skip_whitespace()
                 self.expect('RBRACE')
             else: raise SyntaxError(f"Expected CASE or DEFAULT in SWITCH block")
-            self.skip_whitespace()
         self.expect('RBRACE')
         return SwitchCaseBlock(expression=expression, cases=cases, default_rules=default_rules)
 
     def parse_condition(self) -> str:
         """Parse a condition expression."""
         condition_parts = []
-        while self.current_token() and self.current_token()[0] not in ('LBRACE', 'RBRACE', 'RPAREN', 'TRANSFORM', 'DEFAULT', 'AS', 'MESSAGE', 'FORMAT', 'DISTINCT', 'RULES', 'SOURCE', 'TARGET', 'COMPONENT', 'CLEANSE', 'VAR', 'CONST', 'MACRO', 'SELECT', 'FILTER'):
+        while True:
             token = self.current_token()
-            if token[0] not in ('WS', 'COMMENT', 'BLOCK_COMMENT'):
-                condition_parts.append(token[1])
-            self.advance()
+            if token is None or token[0] in _CONDITION_STOP:
+                break
+            condition_parts.append(token[1])
+            self._buf.popleft()
         return ' '.join(condition_parts)
     def parse_object_block(self) -> ObjectBlock:
         """Parse OBJECT prefix { rules } block."""
-        self.skip_whitespace()
         token = self.current_token()
         prefix = ""
         is_dynamic = False
@@ -813,13 +768,11 @@ class Parser:
         else:
             prefix = self.parse_value()
             
-        self.skip_whitespace()
         self.expect('LBRACE')
         rules = []
         while self.current_token() and self.current_token()[0] != 'RBRACE':
             rule = self.parse_rule()
             if rule: rules.append(rule)
-            self.skip_whitespace()
         self.expect('RBRACE')
         return ObjectBlock(prefix=prefix, rules=rules, is_dynamic_prefix=is_dynamic)
 
@@ -829,34 +782,415 @@ class Parser:
         item_alias = None
         index_alias = None
 
-        self.skip_whitespace()
         if self.match('AS'):
             item_alias = self.expect('IDENT')[1]
-            self.skip_whitespace()
 
         if self.current_token() and self.current_token()[1].upper() == 'INDEX':
             self.advance()
             index_alias = self.expect('IDENT')[1]
-            self.skip_whitespace()
 
         self.expect('LBRACE')
         rules = []
         while self.current_token() and self.current_token()[0] != 'RBRACE':
             rule = self.parse_rule()
             if rule: rules.append(rule)
-            self.skip_whitespace()
         self.expect('RBRACE')
 
         return LoopBlock(collection=collection, item_alias=item_alias, index_alias=index_alias, rules=rules)
 
 
+# Generated-code sections that do not depend on the mapping are kept as
+# whole templates and emitted with a single append each.
+# Body expression of each generated transform; every entry becomes a
+# ``lambda value, *args`` in the generated _TRANSFORMS table.
+_TRANSFORM_EXPRS = {
+    'upper': 'str(value).upper()',
+    'lower': 'str(value).lower()',
+    'trim': 'str(value).strip()',
+    'int': 'int(value)',
+    'float': 'float(value)',
+    'str': 'str(value)',
+    'format_date': 'format_date_func(value, *args)',
+    'format_number': 'format_number_func(value, *args)',
+    'substring': 'str(value)[:int(args[0])] if args else value',
+    'concat': 'str(value) + "".join(str(a) for a in args)',
+    'left': 'str(value)[:int(args[0])] if args else value',
+    'right': 'str(value)[-int(args[0]):] if args else value',
+    'len': 'len(str(value))',
+    'split': 'str(value).split(args[0]) if args else str(value).split()',
+    'join': 'args[0].join(value) if args and isinstance(value, list) else "".join(value) if isinstance(value, list) else value',
+    'replace': 'str(value).replace(str(args[0]), str(args[1])) if len(args) > 1 else value',
+    'abs': 'abs(float(value))',
+    'mod': 'float(value) % float(args[0]) if args else value',
+    'pow': 'float(value) ** float(args[0]) if args else value',
+    'sqrt': 'math.sqrt(float(value))',
+    'round': 'round(float(value), int(args[0])) if args else round(float(value))',
+    'now': 'datetime.datetime.now().isoformat()',
+    'today': 'datetime.date.today().isoformat()',
+    'date_diff': 'date_diff_func(value, *args)',
+    'add_days': 'date_add_func(value, days=int(args[0])) if args else value',
+    'add_months': 'date_add_func(value, months=int(args[0])) if args else value',
+    'ifelse': 'args[0] if value else args[1] if len(args) > 1 else None',
+    'coalesce': 'value if value is not None else next((a for a in args if a is not None), None)',
+    'read_file': '_read_file(args[0])',
+    'write_file': '_write_file(args[0], value)',
+    'append_file': '_append_file(args[0], value)',
+    'lookup': 'lookup_func(value, *args)',
+    'api_get': 'requests.get(args[0], params=json.loads(args[1]) if len(args)>1 else {}).json()',
+    'env': 'os.environ.get(str(args[0]), args[1] if len(args)>1 else None)',
+}
+
+# Transforms that cannot raise on a non-None value are emitted inline in
+# the row loop instead of going through transform_value.
+_INLINE_TRANSFORMS = {
+    'upper': 'str(_v).upper()',
+    'lower': 'str(_v).lower()',
+    'trim': 'str(_v).strip()',
+    'str': 'str(_v)',
+}
+
+_TRANSFORM_VALUE = '''\
+def transform_value(value, func_name, *args, row_num=0, rank_val=0):
+    """Apply transformation function to value."""
+    if value is None and func_name not in ("now", "today", "coalesce", "row_number", "rank", "read_file", "env", "api_get"):
+        return None
+    if func_name == "row_number": return row_num
+    if func_name == "rank": return rank_val
+    fn = _TRANSFORMS.get(func_name)
+    if fn is None:
+        return value
+    try:
+        return fn(value, *args)
+    except Exception as e:
+        print(f"Transform error: {e}")
+    return value
+'''
+
+_HELPER_FUNCTIONS = '''\
+def _read_file(path):
+    with open(path, "r") as f: return f.read()
+
+def _write_file(path, value):
+    with open(path, "w") as f: f.write(str(value))
+    return value
+
+def _append_file(path, value):
+    with open(path, "a") as f: f.write(str(value))
+    return value
+
+def _to_datetime(value):
+    import datetime
+    if isinstance(value, datetime.datetime): return value
+    if isinstance(value, datetime.date): return datetime.datetime.combine(value, datetime.time())
+    for fmt in ["%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%Y-%m-%dT%H:%M:%S"]:
+        try: return datetime.datetime.strptime(str(value), fmt)
+        except ValueError: continue
+    return None
+
+def date_diff_func(v1, v2):
+    d1, d2 = _to_datetime(v1), _to_datetime(v2)
+    return (d1 - d2).days if d1 and d2 else None
+
+def date_add_func(v, days=0, months=0):
+    import datetime
+    d = _to_datetime(v)
+    if not d: return v
+    if days: d += datetime.timedelta(days=days)
+    if months:
+        month = d.month - 1 + months
+        year = d.year + month // 12
+        month = month % 12 + 1
+        day = min(d.day, [31, 29 if year % 4 == 0 and (year % 100 != 0 or year % 400 == 0) else 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31][month-1])
+        d = d.replace(year=year, month=month, day=day)
+    return d.isoformat()
+
+def format_date_func(value, fmt):
+    import datetime
+    try:
+        if isinstance(value, str):
+            for f in ["%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y"]:
+                try:
+                    dt = datetime.datetime.strptime(value, f)
+                    return dt.strftime(fmt.replace("YYYY", "%Y").replace("MM", "%m").replace("DD", "%d"))
+                except ValueError: continue
+    except: pass
+    return value
+
+_NUMBER_FORMAT_SPECS = {"#,##0.00": ",.2f", "999999.99": "08.2f"}
+
+def format_number_func(value, fmt):
+    spec = _NUMBER_FORMAT_SPECS.get(fmt)
+    if spec is None: return value
+    try: return format(float(value), spec)
+    except (ValueError, TypeError): return value
+
+def lookup_func(key, table_path, key_col, val_col):
+    """Lookup value in external CSV or JSON file."""
+    import csv, json
+    if table_path.endswith(".csv"):
+        with open(table_path, "r") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                if str(row.get(key_col)) == str(key): return row.get(val_col)
+    elif table_path.endswith(".json"):
+        with open(table_path, "r") as f:
+            data = json.load(f)
+            if isinstance(data, list):
+                for row in data:
+                    if str(row.get(key_col)) == str(key): return row.get(val_col)
+            elif isinstance(data, dict): return data.get(str(key))
+    return None
+
+def set_nested_value(d, path, value):
+    """Set value in nested dictionary using slash-separated path."""
+    parts = path.split("/")
+    curr = d
+    for part in parts[:-1]:
+        if part not in curr: curr[part] = {}
+        curr = curr[part]
+    curr[parts[-1]] = value
+'''
+
+_TYPE_MAP = {
+    'integer': 'int',
+    'int': 'int',
+    'string': 'str',
+    'str': 'str',
+    'decimal': 'float',
+    'float': 'float',
+    'boolean': 'bool',
+    'bool': 'bool',
+}
+
+_INDENT = {n: '    ' * n for n in range(1, 7)}
+
+
+_DISTINCT_FILTER = '''\
+    # --- Duplicate Detection (Distinct) ---
+    seen, unique_items = set(), []
+    for item in data_items:
+        t = tuple(sorted(item.items()))
+        if t not in seen: seen.add(t); unique_items.append(item)
+    data_items = unique_items'''
+
+_SOURCE_READERS = {
+    'XML': '''\
+    tree = ET.parse(input_data)
+    data_items = parse_xml_data(tree.getroot())''',
+    'CSV': '''\
+    data_items = []
+    with open(input_data, "r", newline="") as f:
+        reader = csv.DictReader(f, delimiter={delimiter!r})
+        for row in reader: data_items.append(dict(row))''',
+    'DB': '''\
+    conn = sqlite3.connect({conn_str!r})
+    cursor = conn.cursor()
+    cursor.execute({query!r})
+    columns = [desc[0] for desc in cursor.description]
+    data_items = [dict(zip(columns, row)) for row in cursor.fetchall()]''',
+    'EDI': '''\
+    with open(input_data, "r") as f: data_items = parse_edi_data(f.read())''',
+}
+
+_TARGET_WRITERS = {
+    'XML': '''\
+    root = ET.Element({root_elem!r})
+    for item in output_items:
+        record = ET.SubElement(root, "Item")
+        for key, value in item.items():
+            ET.SubElement(record, key).text = "" if value is None else str(value)
+    ET.ElementTree(root).write(output_path, encoding="utf-8", xml_declaration=True)''',
+    'CSV': '''\
+    fieldnames = {fieldnames}
+    with open(output_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter={delimiter!r})
+        writer.writeheader()
+        writer.writerows(output_items)''',
+    'DB': '''\
+    if {db_type!r}.lower() != "sqlite":
+        raise NotImplementedError("DB type " + {db_type!r} + " not implemented")
+    columns = list(dict.fromkeys(key for item in output_items for key in item))
+    conn = sqlite3.connect({conn_str!r})
+    if columns:
+        names = ", ".join('"' + str(c).replace('"', '""') + '"' for c in columns)
+        conn.execute("CREATE TABLE IF NOT EXISTS " + {table!r} + " (" + names + ")")
+        sql = "INSERT INTO " + {table!r} + " (" + names + ") VALUES (" + ", ".join("?" * len(columns)) + ")"
+        conn.executemany(sql, [[None if item.get(c) is None else str(item.get(c)) for c in columns] for item in output_items])
+    conn.commit()
+    conn.close()''',
+    'EDI': '''\
+    with open(output_path, "w") as f:
+        f.write({segment_delimiter!r}.join("+".join(str(v) if v else "" for v in item.values()) for item in output_items))''',
+}
+
+
+# Header of a CSV target whose columns depend on the rows written
+_CSV_ROW_FIELDNAMES = 'list(dict.fromkeys(key for item in output_items for key in item))'
+
+# Used when the output columns are known up front: with return_items=False
+# rows go straight from _iter_rows (or _column_rows on the column-wise path)
+# into the file and are never collected.
+# The collected path writes the same header, so both produce the same file.
+_CSV_STREAM_WRITER = '''\
+    if not return_items:
+        with open(output_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames={out_fields!r}, delimiter={delimiter!r})
+            writer.writeheader()
+            writer.writerows({rows})
+        return None'''
+
+
+def _quote_identifier(name: Any) -> str:
+    """SQL identifier in double quotes, with embedded quotes doubled."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _template_params(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Placeholder values for the reader/writer templates from a SOURCE/TARGET config."""
+    return {
+        'db_type': config.get('type', 'sqlite'),
+        'conn_str': config.get('connection_string', ':memory:'),
+        'query': config.get('query', ''),
+        'table': _quote_identifier(config.get('table', 'output')),
+        'root_elem': config.get('root_element', 'Root'),
+        'delimiter': config.get('delimiter', ','),
+        'segment_delimiter': config.get('segment_delimiter', '~'),
+    }
+
+
+def _declared_columns(config: Dict[str, Any]) -> Optional[List[str]]:
+    """Column names declared by a SOURCE config, or None if not given."""
+    columns = config.get('columns')
+    if not columns:
+        return None
+    if isinstance(columns, str):
+        columns = columns.split(',')
+    return [str(c).strip() for c in columns]
+
+
+# CSV reader used when the rules only need a known set of columns: header
+# positions are resolved once and each row keeps just those cells.
+_CSV_PROJECTED_READER = '''\
+    data_items = []
+    fields = {fields!r}
+    with open(input_data, "r", newline="") as f:
+        reader = csv.reader(f, delimiter={delimiter!r})
+        header = next(reader, [])
+        index = {{name: i for i, name in enumerate(header)}}
+        cols = [(name, index[name]) for name in fields if name in index]
+        width = max((i for _, i in cols), default=-1) + 1
+        for row in reader:
+            if not row: continue
+            if len(row) < width: row += [None] * (width - len(row))
+            data_items.append({{name: row[i] for name, i in cols}})'''
+
+# Column-at-a-time variant of the projected reader: cells are gathered into
+# one list per needed field instead of one dict per row.
+_CSV_COLUMN_READER = '''\
+    fields = {fields!r}
+    with open(input_data, "r", newline="") as f:
+        reader = csv.reader(f, delimiter={delimiter!r})
+        header = next(reader, [])
+        index = {{name: i for i, name in enumerate(header)}}
+        cols = [(name, index[name]) for name in fields if name in index]
+        width = max((i for _, i in cols), default=-1) + 1
+        rows = []
+        for row in reader:
+            if not row: continue
+            if len(row) < width: row += [None] * (width - len(row))
+            rows.append(row)
+    missing = [None] * len(rows)
+    source_columns = {{name: [row[i] for row in rows] for name, i in cols}}'''
+
+# Readers for a CSV whose columns are declared in the SOURCE config
+# (columns: "a,b,c"). Positions are known when the code is generated, so
+# there is no header lookup and each needed cell is a fixed index.
+_CSV_SCHEMA_READER = '''\
+    data_items = []
+    with open(input_data, "r", newline="") as f:
+        reader = csv.reader(f, delimiter={delimiter!r}){skip_header}
+        for row in reader:
+            if not row: continue
+            if len(row) < {width}: row += [None] * ({width} - len(row))
+            data_items.append({{{cells}}})'''
+
+_CSV_SCHEMA_COLUMN_READER = '''\
+    with open(input_data, "r", newline="") as f:
+        reader = csv.reader(f, delimiter={delimiter!r}){skip_header}
+        rows = []
+        for row in reader:
+            if not row: continue
+            if len(row) < {width}: row += [None] * ({width} - len(row))
+            rows.append(row)
+    missing = [None] * len(rows)
+    source_columns = {{{cells}}}'''
+
+_CSV_SCHEMA_ROW_READER = '''\
+    data_items = []
+    with open(input_data, "r", newline="") as f:
+        reader = csv.DictReader(f, fieldnames={columns!r}, delimiter={delimiter!r}){skip_header}
+        for row in reader: data_items.append(dict(row))'''
+
+
+# Rendered rule lines keyed on (repr(rule), indent). MappingRule equality
+# treats 1, 1.0 and True alike, but they render differently, so the key is
+# the repr rather than the rule itself.
+_RENDERED_RULES: Dict[Tuple[str, str], Tuple[str, ...]] = {}
+_RENDERED_RULES_MAX = 1024
+
+def _render_mapping_rule(rule: MappingRule, indent: str) -> Tuple[str, ...]:
+    """Generated lines for one MappingRule; rules of the same shape share them."""
+    key = (repr(rule), indent)
+    lines = _RENDERED_RULES.get(key)
+    if lines is None:
+        if len(_RENDERED_RULES) >= _RENDERED_RULES_MAX: _RENDERED_RULES.clear()
+        lines = _RENDERED_RULES[key] = _render_rule_lines(rule, indent)
+    return lines
+
+def _render_rule_lines(rule: MappingRule, indent: str) -> Tuple[str, ...]:
+    lines = []
+    if rule.source_field and (rule.source_field.startswith('"') or rule.source_field.startswith("'")):
+        src_var, is_lit = rule.source_field, True
+    else: src_var, is_lit = f'_get("{rule.source_field}")', False
+    val_expr = src_var
+    if rule.transform:
+        f_name, args = rule.transform
+        args_str = ', '.join(repr(a) for a in args)
+        if f_name in _INLINE_TRANSFORMS:
+            # Bind the source value once so the None check and the
+            # default test below do not look it up again.
+            lines.append(f'{indent}_v = {src_var}')
+            src_var = '_v'
+            val_expr = f'(None if _v is None else {_INLINE_TRANSFORMS[f_name]})'
+        elif args_str:
+            val_expr = f'transform_value({src_var}, "{f_name}", {args_str}, row_num=row_num, rank_val=rank_val)'
+        else:
+            val_expr = f'transform_value({src_var}, "{f_name}", row_num=row_num, rank_val=rank_val)'
+    if rule.data_type: val_expr = f'{_TYPE_MAP.get(rule.data_type, rule.data_type)}({val_expr})'
+    target_expr = f'"{rule.target_field}"'
+    if rule.is_dynamic_target:
+        # Resolve dynamic field name at runtime
+        lines.append(f'{indent}target_field_name = str(eval({repr(rule.target_field)}, {{}}, source_item))')
+        target_expr = 'target_field_name'
+    if rule.default_value is not None:
+        lines.append(f'{indent}set_nested_value(target_item, {target_expr}, {val_expr} if {"True" if is_lit else src_var} else {repr(rule.default_value)})')
+    else:
+        lines.append(f'{indent}set_nested_value(target_item, {target_expr}, {val_expr})')
+    return tuple(lines)
+
+
 class CodeGenerator:
     """Generates executable Python code from mapping definition."""
     
     def __init__(self, mapping: Mapping):
         self.mapping = mapping
         self.imports = set()
-        self.code_lines = []
+        self._buf = io.StringIO()
+
+    def emit(self, code: str):
+        """Write one line (or pre-joined block) of generated code."""
+        self._buf.write(code)
+        self._buf.write('\n')
         
     def generate(self) -> str:
         """Generate complete Python code."""
@@ -864,12 +1198,14 @@ class CodeGenerator:
         self._generate_classes()
         self._generate_functions()
         self._generate_main()
-        return '\n'.join(self.code_lines)
+        return self._buf.getvalue()
     
     def _generate_header(self):
         """Generate imports and header."""
         self.imports.add('import csv')
+        self.imports.add('import datetime')
         self.imports.add('import json')
+        self.imports.add('import math')
         self.imports.add('import os')
         self.imports.add('import requests')
         main_source = self.mapping.sources[0] if self.mapping.sources else None
@@ -880,281 +1216,302 @@ class CodeGenerator:
             self.imports.add('import sqlite3')
         if (main_source and main_source.type == 'EDI') or (main_target and main_target.type == 'EDI'):
             self.imports.add('import re')
-        self.code_lines.extend(sorted(list(self.imports)))
-        self.code_lines.append('')
-        self.code_lines.append(f'# Data Mapping: {self.mapping.name}')
-        self.code_lines.append('')
+        for line in sorted(self.imports): self.emit(line)
+        self.emit(f'\n# Data Mapping: {self.mapping.name}\n')
     
     def _generate_classes(self): pass
     
     def _generate_functions(self):
         """Generate helper functions."""
-        self.code_lines.append('def transform_value(value, func_name, *args, row_num=0, rank_val=0):')
-        self.code_lines.append('    """Apply transformation function to value."""')
-        self.code_lines.append('    if value is None and func_name not in ("now", "today", "coalesce", "row_number", "rank", "read_file", "env", "api_get"):')
-        self.code_lines.append('        return None')
-        self.code_lines.append('')
-        self.code_lines.append('    try:')
-        transforms = {
-            'upper': 'return str(value).upper()',
-            'lower': 'return str(value).lower()',
-            'trim': 'return str(value).strip()',
-            'int': 'return int(value)',
-            'float': 'return float(value)',
-            'str': 'return str(value)',
-            'format_date': 'return format_date_func(value, *args)',
-            'format_number': 'return format_number_func(value, *args)',
-            'substring': 'return str(value)[:int(args[0])] if args else value',
-            'concat': 'return str(value) + "".join(str(a) for a in args)',
-            'left': 'return str(value)[:int(args[0])] if args else value',
-            'right': 'return str(value)[-int(args[0]):] if args else value',
-            'len': 'return len(str(value))',
-            'split': 'return str(value).split(args[0]) if args else str(value).split()',
-            'join': 'return args[0].join(value) if args and isinstance(value, list) else "".join(value) if isinstance(value, list) else value',
-            'replace': 'return str(value).replace(str(args[0]), str(args[1])) if len(args) > 1 else value',
-            'abs': 'return abs(float(value))',
-            'mod': 'return float(value) % float(args[0]) if args else value',
-            'pow': 'return float(value) ** float(args[0]) if args else value',
-            'sqrt': 'import math; return math.sqrt(float(value))',
-            'round': 'return round(float(value), int(args[0])) if args else round(float(value))',
-            'now': 'import datetime; return datetime.datetime.now().isoformat()',
-            'today': 'import datetime; return datetime.date.today().isoformat()',
-            'date_diff': 'return date_diff_func(value, *args)',
-            'add_days': 'return date_add_func(value, days=int(args[0])) if args else value',
-            'add_months': 'return date_add_func(value, months=int(args[0])) if args else value',
-            'ifelse': 'return args[0] if value else args[1] if len(args) > 1 else None',
-            'coalesce': 'return value if value is not None else next((a for a in args if a is not None), None)',
-            'row_number': 'return row_num',
-            'rank': 'return rank_val',
-            'read_file': 'with open(args[0], "r") as f: return f.read()',
-            'write_file': 'with open(args[0], "w") as f: f.write(str(value)); return value',
-            'append_file': 'with open(args[0], "a") as f: f.write(str(value)); return value',
-            'lookup': 'return lookup_func(value, *args)',
-            'api_get': 'return requests.get(args[0], params=json.loads(args[1]) if len(args)>1 else {}).json()',
-            'env': 'return os.environ.get(str(args[0]), args[1] if len(args)>1 else None)',
-        }
-        for func, code in transforms.items():
-            self.code_lines.append(f'    if func_name == "{func}":')
-            self.code_lines.append(f'        {code}')
-        self.code_lines.append('    except Exception as e:')
-        self.code_lines.append('        print(f"Transform error: {e}")')
-        self.code_lines.append('    return value')
-        self.code_lines.append('')
-        self.code_lines.append('def _to_datetime(value):')
-        self.code_lines.append('    import datetime')
-        self.code_lines.append('    if isinstance(value, datetime.datetime): return value')
-        self.code_lines.append('    if isinstance(value, datetime.date): return datetime.datetime.combine(value, datetime.time())')
-        self.code_lines.append('    for fmt in ["%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%Y-%m-%dT%H:%M:%S"]:')
-        self.code_lines.append('        try: return datetime.datetime.strptime(str(value), fmt)')
-        self.code_lines.append('        except ValueError: continue')
-        self.code_lines.append('    return None')
-        self.code_lines.append('')
-        self.code_lines.append('def date_diff_func(v1, v2):')
-        self.code_lines.append('    d1, d2 = _to_datetime(v1), _to_datetime(v2)')
-        self.code_lines.append('    return (d1 - d2).days if d1 and d2 else None')
-        self.code_lines.append('')
-        self.code_lines.append('def date_add_func(v, days=0, months=0):')
-        self.code_lines.append('    import datetime')
-        self.code_lines.append('    d = _to_datetime(v)')
-        self.code_lines.append('    if not d: return v')
-        self.code_lines.append('    if days: d += datetime.timedelta(days=days)')
-        self.code_lines.append('    if months:')
-        self.code_lines.append('        month = d.month - 1 + months')
-        self.code_lines.append('        year = d.year + month // 12')
-        self.code_lines.append('        month = month % 12 + 1')
-        self.code_lines.append('        day = min(d.day, [31, 29 if year % 4 == 0 and (year % 100 != 0 or year % 400 == 0) else 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31][month-1])')
-        self.code_lines.append('        d = d.replace(year=year, month=month, day=day)')
-        self.code_lines.append('    return d.isoformat()')
-        self.code_lines.append('')
-        self.code_lines.append('def format_date_func(value, fmt):')
-        self.code_lines.append('    import datetime')
-        self.code_lines.append('    try:')
-        self.code_lines.append('        if isinstance(value, str):')
-        self.code_lines.append('            for f in ["%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y"]:')
-        self.code_lines.append('                try:')
-        self.code_lines.append('                    dt = datetime.datetime.strptime(value, f)')
-        self.code_lines.append('                    return dt.strftime(fmt.replace("YYYY", "%Y").replace("MM", "%m").replace("DD", "%d"))')
-        self.code_lines.append('                except ValueError: continue')
-        self.code_lines.append('    except: pass')
-        self.code_lines.append('    return value')
-        self.code_lines.append('')
-        self.code_lines.append('def format_number_func(value, fmt):')
-        self.code_lines.append('    try:')
-        self.code_lines.append('        num = float(value)')
-        self.code_lines.append('        if fmt == "#,##0.00": return f"{num:,.2f}"')
-        self.code_lines.append('        elif fmt == "999999.99": return f"{num:08.2f}"')
-        self.code_lines.append('    except: pass')
-        self.code_lines.append('    return value')
-        self.code_lines.append('')
-        self.code_lines.append('def lookup_func(key, table_path, key_col, val_col):')
-        self.code_lines.append('    """Lookup value in external CSV or JSON file."""')
-        self.code_lines.append('    import csv, json')
-        self.code_lines.append('    if table_path.endswith(".csv"):')
-        self.code_lines.append('        with open(table_path, "r") as f:')
-        self.code_lines.append('            reader = csv.DictReader(f)')
-        self.code_lines.append('            for row in reader:')
-        self.code_lines.append('                if str(row.get(key_col)) == str(key): return row.get(val_col)')
-        self.code_lines.append('    elif table_path.endswith(".json"):')
-        self.code_lines.append('        with open(table_path, "r") as f:')
-        self.code_lines.append('            data = json.load(f)')
-        self.code_lines.append('            if isinstance(data, list):')
-        self.code_lines.append('                for row in data:')
-        self.code_lines.append('                    if str(row.get(key_col)) == str(key): return row.get(val_col)')
-        self.code_lines.append('            elif isinstance(data, dict): return data.get(str(key))')
-        self.code_lines.append('    return None')
-        self.code_lines.append('')
-        self.code_lines.append('def set_nested_value(d, path, value):')
-        self.code_lines.append('    """Set value in nested dictionary using slash-separated path."""')
-        self.code_lines.append('    parts = path.split("/")')
-        self.code_lines.append('    curr = d')
-        self.code_lines.append('    for part in parts[:-1]:')
-        self.code_lines.append('        if part not in curr: curr[part] = {}')
-        self.code_lines.append('        curr = curr[part]')
-        self.code_lines.append('    curr[parts[-1]] = value')
-        self.code_lines.append('')
+        self.emit('_TRANSFORMS = {')
+        self.emit('\n'.join(f'    "{name}": lambda value, *args: {expr},' for name, expr in _TRANSFORM_EXPRS.items()))
+        self.emit('}\n')
+        self.emit(_TRANSFORM_VALUE)
+        self.emit(_HELPER_FUNCTIONS)
     
     def _generate_main(self):
         """Generate main mapping function."""
-        self.code_lines.append('def execute_mapping(input_data, output_path):')
+        self.emit('def execute_mapping(input_data, output_path, return_items=True):')
         main_source = self.mapping.sources[0] if self.mapping.sources else SourceConfig(type='CSV')
         source_type = main_source.type.upper()
-        if source_type == 'XML':
-            self.code_lines.append('    tree = ET.parse(input_data)')
-            self.code_lines.append('    data_items = parse_xml_data(tree.getroot())')
-        elif source_type == 'CSV':
-            self.code_lines.append('    data_items = []')
-            self.code_lines.append('    with open(input_data, "r", newline="") as f:')
-            self.code_lines.append('        reader = csv.DictReader(f)')
-            self.code_lines.append('        for row in reader: data_items.append(dict(row))')
-        elif source_type == 'DB':
-            self.code_lines.append('    conn = sqlite3.connect(":memory:")')
-            self.code_lines.append('    cursor = conn.cursor()')
-            self.code_lines.append('    cursor.execute("SELECT query")')
-            self.code_lines.append('    columns = [desc[0] for desc in cursor.description]')
-            self.code_lines.append('    data_items = [dict(zip(columns, row)) for row in cursor.fetchall()]')
-        elif source_type == 'EDI':
-            self.code_lines.append('    with open(input_data, "r") as f: data_items = parse_edi_data(f.read())')
-        else: self.code_lines.append('    data_items = input_data')
+        fields = self._projected_fields() if source_type == 'CSV' else None
+        columnar = self._is_columnar(fields)
+        params = _template_params(main_source.config)
+        declared = _declared_columns(main_source.config) if source_type == 'CSV' else None
+        if declared is not None:
+            self.emit(self._schema_reader(declared, fields, columnar, params))
+        elif columnar:
+            self.emit(_CSV_COLUMN_READER.format(fields=fields, **params))
+        elif fields is not None:
+            self.emit(_CSV_PROJECTED_READER.format(fields=fields, **params))
+        else:
+            self.emit(_SOURCE_READERS.get(source_type, '    data_items = input_data').format(**params))
         
         # --- Variables ---
         if self.mapping.variables:
-            self.code_lines.append('    # Variables')
+            self.emit('    # Variables')
             for var in self.mapping.variables:
                 val = var.value
                 if isinstance(val, str) and (val.startswith('"') or val.startswith("'")):
                     val = val[1:-1]
-                self.code_lines.append(f'    {var.name} = {repr(val)}')
-            self.code_lines.append('')
+                self.emit(f'    {var.name} = {repr(val)}')
+            self.emit('')
         
         if self.mapping.cleanse:
-            self.code_lines.append('    # --- Data Cleansing ---')
-            self.code_lines.append('    for item in data_items:')
+            self.emit('    # --- Data Cleansing ---')
+            self.emit('    for item in data_items:')
             if self.mapping.cleanse.trim:
-                self.code_lines.append('        for k, v in item.items():')
-                self.code_lines.append('            if isinstance(v, str): item[k] = v.strip()')
+                self.emit('        for k, v in item.items():')
+                self.emit('            if isinstance(v, str): item[k] = v.strip()')
             if self.mapping.cleanse.case:
                 case_func = 'upper' if self.mapping.cleanse.case == 'UPPER' else 'lower'
-                self.code_lines.append('        for k, v in item.items():')
-                self.code_lines.append(f'            if isinstance(v, str): item[k] = v.{case_func}()')
+                self.emit('        for k, v in item.items():')
+                self.emit(f'            if isinstance(v, str): item[k] = v.{case_func}()')
 
         if self.mapping.validations:
-            self.code_lines.append('    # --- Validation ---')
-            self.code_lines.append('    valid_items = []')
-            self.code_lines.append('    for item in data_items:')
-            self.code_lines.append('        is_valid = True')
+            self.emit('    # --- Validation ---')
+            self.emit('    valid_items = []')
+            self.emit('    for item in data_items:')
+            self.emit('        is_valid = True')
             for v in self.mapping.validations:
                 if v.format:
-                    self.code_lines.append(f'        if not re.match({repr(v.format)}, str(item.get("{v.field}", ""))): is_valid = False')
+                    self.emit(f'        if not re.match({repr(v.format)}, str(item.get("{v.field}", ""))): is_valid = False')
                 if v.condition:
                     cond = self._translate_condition(v.condition)
-                    self.code_lines.append(f'        try:')
-                    self.code_lines.append(f'            if not eval({repr(cond)}, {{}}, item): is_valid = False')
-                    self.code_lines.append(f'        except: pass')
-            self.code_lines.append('        if is_valid: valid_items.append(item)')
-            self.code_lines.append('    data_items = valid_items')
+                    self.emit(f'        try:')
+                    self.emit(f'            if not eval({repr(cond)}, {{}}, item): is_valid = False')
+                    self.emit(f'        except: pass')
+            self.emit('        if is_valid: valid_items.append(item)')
+            self.emit('    data_items = valid_items')
 
         if self.mapping.distinct:
-            self.code_lines.append('    # --- Duplicate Detection (Distinct) ---')
-            self.code_lines.append('    seen, unique_items = set(), []')
-            self.code_lines.append('    for item in data_items:')
-            self.code_lines.append('        t = tuple(sorted(item.items()))')
-            self.code_lines.append('        if t not in seen: seen.add(t); unique_items.append(item)')
-            self.code_lines.append('    data_items = unique_items')
+            self.emit(_DISTINCT_FILTER)
 
         if self.mapping.input_filter:
-            self.code_lines.append('    # --- Input Selection ---')
+            self.emit('    # --- Input Selection ---')
             cond = self._translate_condition(self.mapping.input_filter)
-            self.code_lines.append(f'    data_items = [item for item in data_items if eval({repr(cond)}, {{}}, item)]')
-            self.code_lines.append('')
-
-        self.code_lines.append('    output_items = []')
-        self.code_lines.append('    for i, source_item in enumerate(data_items):')
-        self.code_lines.append('        target_item, row_num, rank_val = {}, i + 1, i + 1')
-        for rule in self.mapping.rules: self._generate_rule_code(rule, indent_level=2)
-        self.code_lines.append('        output_items.append(target_item)')
+            self.emit(f'    data_items = [item for item in data_items if eval({repr(cond)}, {{}}, item)]')
+            self.emit('')
+
+        target = self.mapping.target or TargetConfig(type='CSV')
+        out_fields = self._output_fields() if target.type.upper() == 'CSV' else None
+        if columnar:
+            self._generate_column_mapping()
+            if out_fields is not None:
+                self.emit(_CSV_STREAM_WRITER.format(rows='_column_rows()', out_fields=out_fields, **_template_params(target.config)))
+            self.emit('    output_items = list(_column_rows())')
+        else:
+            self.emit('    def _iter_rows(data_items):')
+            self.emit('        for i, source_item in enumerate(data_items):')
+            self.emit('            target_item, row_num, rank_val = {}, i + 1, i + 1')
+            self.emit('            _get = source_item.get')
+            for rule in self.mapping.rules: self._generate_rule_code(rule, indent_level=3)
+            self.emit('            yield target_item')
+            self.emit('')
+            if out_fields is not None:
+                self.emit(_CSV_STREAM_WRITER.format(rows='_iter_rows(data_items)', out_fields=out_fields, **_template_params(target.config)))
+            self.emit('    output_items = list(_iter_rows(data_items))')
         
         if self.mapping.output_filter:
-            self.code_lines.append('')
-            self.code_lines.append('    # --- Output Filtering ---')
+            self.emit('')
+            self.emit('    # --- Output Filtering ---')
             cond = self._translate_condition(self.mapping.output_filter)
-            self.code_lines.append(f'    output_items = [item for item in output_items if eval({repr(cond)}, {{}}, item)]')
-            self.code_lines.append('')
+            self.emit(f'    output_items = [item for item in output_items if eval({repr(cond)}, {{}}, item)]')
+            self.emit('')
         
         if self.mapping.aggregate:
-            self.code_lines.append('    grouped_data = {}')
+            self.emit('    grouped_data = {}')
             keys = ", ".join(f'source_item.get("{k}")' for k in self.mapping.aggregate.group_by)
-            self.code_lines.append(f'    for source_item in output_items:')
-            self.code_lines.append(f'        key = ({keys})')
-            self.code_lines.append('        if key not in grouped_data: grouped_data[key] = []')
-            self.code_lines.append('        grouped_data[key].append(source_item)')
-            self.code_lines.append('    final_output = []')
-            self.code_lines.append('    for key, group in grouped_data.items():')
-            self.code_lines.append('        summary = {}')
-            for i, k in enumerate(self.mapping.aggregate.group_by): self.code_lines.append(f'        set_nested_value(summary, "{k}", key[{i}])')
+            self.emit(f'    for source_item in output_items:')
+            self.emit(f'        key = ({keys})')
+            self.emit('        if key not in grouped_data: grouped_data[key] = []')
+            self.emit('        grouped_data[key].append(source_item)')
+            self.emit('    final_output = []')
+            self.emit('    for key, group in grouped_data.items():')
+            self.emit('        summary = {}')
+            for i, k in enumerate(self.mapping.aggregate.group_by): self.emit(f'        set_nested_value(summary, "{k}", key[{i}])')
             for agg_rule in self.mapping.aggregate.rules: self._generate_aggregate_rule(agg_rule)
-            self.code_lines.append('        final_output.append(summary)')
-            self.code_lines.append('    output_items = final_output')
+            self.emit('        final_output.append(summary)')
+            self.emit('    output_items = final_output')
         
-        target = self.mapping.target or TargetConfig(type='CSV')
-        t_type = target.type.upper()
-        if t_type == 'XML': self.code_lines.append('    write_xml_output(output_items, output_path)')
-        elif t_type == 'CSV': self.code_lines.append('    write_csv_output(output_items, output_path)')
-        elif t_type == 'DB': self.code_lines.append('    write_db_output(output_items)')
-        elif t_type == 'EDI': self.code_lines.append('    write_edi_output(output_items, output_path)')
-        self.code_lines.append('    return output_items')
+        writer = _TARGET_WRITERS.get(target.type.upper())
+        fieldnames = _CSV_ROW_FIELDNAMES if out_fields is None else repr(out_fields)
+        if writer: self.emit(writer.format(fieldnames=fieldnames, **_template_params(target.config)))
+        self.emit('    return output_items')
+
+    def _schema_reader(self, columns: List[str], fields: Optional[List[str]], columnar: bool, params: Dict[str, Any]) -> str:
+        """Reader specialised to the declared CSV columns."""
+        header = str(self.mapping.sources[0].config.get('has_header', 'true')).lower() == 'true'
+        skip_header = '\n        next(reader, None)' if header else ''
+        if fields is None:
+            return _CSV_SCHEMA_ROW_READER.format(columns=columns, skip_header=skip_header, **params)
+        index = {name: i for i, name in enumerate(columns)}
+        cols = [(name, index[name]) for name in fields if name in index]
+        width = max((i for _, i in cols), default=-1) + 1
+        if columnar:
+            cells = ', '.join(f'{name!r}: [row[{i}] for row in rows]' for name, i in cols)
+            return _CSV_SCHEMA_COLUMN_READER.format(cells=cells, width=width, skip_header=skip_header, **params)
+        cells = ', '.join(f'{name!r}: row[{i}]' for name, i in cols)
+        return _CSV_SCHEMA_READER.format(cells=cells, width=width, skip_header=skip_header, **params)
+
+    def _projected_fields(self) -> Optional[List[str]]:
+        """Source fields the rules read, or None if whole rows are needed.
+
+        Validations, SELECT, DISTINCT, IF conditions, dynamic targets and
+        macro calls may look at any column, so none of them can be projected.
+        """
+        m = self.mapping
+        if m.validations or m.input_filter or m.distinct:
+            return None
+        fields = []
+        if not self._collect_fields(m.rules, fields):
+            return None
+        return list(dict.fromkeys(fields))
+
+    def _collect_fields(self, rules: List[Any], fields: List[str]) -> bool:
+        """Append the source fields read by rules; False if they cannot be known."""
+        for rule in rules:
+            if isinstance(rule, MappingRule):
+                if rule.is_dynamic_target:
+                    return False
+                if rule.source_field and not rule.source_field.startswith(('"', "'")):
+                    fields.append(rule.source_field)
+            elif isinstance(rule, (IfElseBlock, MacroCall)):
+                return False
+            elif isinstance(rule, TryCatchBlock):
+                if not (self._collect_fields(rule.try_rules, fields) and self._collect_fields(rule.catch_rules, fields)):
+                    return False
+            elif isinstance(rule, SwitchCaseBlock):
+                fields.append(rule.expression)
+                if not all(self._collect_fields(r, fields) for r in (*rule.cases.values(), rule.default_rules)):
+                    return False
+            elif isinstance(rule, LoopBlock):
+                fields.append(rule.collection)
+                if not self._collect_fields(rule.rules, fields):
+                    return False
+            elif isinstance(rule, ObjectBlock):
+                if not self._collect_fields(rule.rules, fields):
+                    return False
+        return True
+
+    def _output_fields(self) -> Optional[List[str]]:
+        """Top-level output columns in rule order, or None if rows must be collected.
+
+        Rows can only be streamed straight to the writer when no FILTER or
+        AGGREGATE pass needs the full list and every target is static.
+        """
+        m = self.mapping
+        if m.output_filter or m.aggregate:
+            return None
+        fields = []
+        if not self._collect_targets(m.rules, '', fields) or not fields:
+            return None
+        return list(dict.fromkeys(fields))
+
+    def _collect_targets(self, rules: List[Any], prefix: str, fields: List[str]) -> bool:
+        """Append the top-level target names written by rules; False if they cannot be known.
+
+        An OBJECT prefix reaches only what apply_prefix rewrites (MappingRules
+        and IF/ELSE branches); other blocks inside it keep their own targets.
+        """
+        for rule in rules:
+            if isinstance(rule, MappingRule):
+                if rule.is_dynamic_target:
+                    return False
+                if rule.target_field:
+                    fields.append((prefix or rule.target_field).split('/')[0])
+            elif isinstance(rule, IfElseBlock):
+                if not (self._collect_targets(rule.if_rules, prefix, fields) and self._collect_targets(rule.else_rules, prefix, fields)):
+                    return False
+            elif isinstance(rule, TryCatchBlock):
+                if not (self._collect_targets(rule.try_rules, '', fields) and self._collect_targets(rule.catch_rules, '', fields)):
+                    return False
+            elif isinstance(rule, SwitchCaseBlock):
+                if not all(self._collect_targets(r, '', fields) for r in (*rule.cases.values(), rule.default_rules)):
+                    return False
+            elif isinstance(rule, LoopBlock):
+                if not self._collect_targets(rule.rules, '', fields):
+                    return False
+            elif isinstance(rule, ObjectBlock):
+                if rule.is_dynamic_prefix or not self._collect_targets(rule.rules, rule.prefix, fields):
+                    return False
+            elif isinstance(rule, MacroCall):
+                return False
+        return True
+
+    def _is_columnar(self, fields: Optional[List[str]]) -> bool:
+        """Whether the rules can be applied a column at a time.
+
+        That needs a projected CSV source, no CLEANSE pass, and only flat,
+        static MappingRules whose transforms can be inlined.
+        """
+        if fields is None or self.mapping.cleanse:
+            return False
+        rules = self.mapping.rules
+        return all(
+            isinstance(r, MappingRule) and '/' not in r.target_field
+            and (not r.transform or r.transform[0] in _INLINE_TRANSFORMS)
+            for r in rules
+        ) and any(r.target_field for r in rules)
+
+    def _generate_column_mapping(self):
+        """Generate the column-wise equivalent of the per-row rule loop."""
+        rules = [r for r in self.mapping.rules if r.target_field]
+        self.emit('    # --- Column-wise Mapping ---')
+        self.emit(f'    targets = {[r.target_field for r in rules]!r}')
+        self.emit('    columns = []')
+        for rule in rules:
+            is_lit = rule.source_field.startswith(('"', "'"))
+            if is_lit:
+                self.emit(f'    col = [{rule.source_field}] * len(rows)')
+            else:
+                self.emit(f'    col = source_columns.get("{rule.source_field}", missing)')
+            val_expr = '_v'
+            if rule.transform:
+                val_expr = f'(None if _v is None else {_INLINE_TRANSFORMS[rule.transform[0]]})'
+            if rule.data_type: val_expr = f'{_TYPE_MAP.get(rule.data_type, rule.data_type)}({val_expr})'
+            if rule.default_value is not None:
+                val_expr = f'{val_expr} if {"True" if is_lit else "_v"} else {repr(rule.default_value)}'
+            if val_expr == '_v':
+                self.emit('    columns.append(col)')
+            else:
+                self.emit(f'    columns.append([{val_expr} for _v in col])')
+        self.emit('    def _column_rows():')
+        self.emit('        return (dict(zip(targets, values)) for values in zip(*columns))')
+        self.emit('')
 
     def _generate_rule_code(self, rule: Any, indent_level: int = 2):
-        indent = "    " * indent_level
+        indent = _INDENT.get(indent_level) or "    " * indent_level
         if isinstance(rule, IfElseBlock):
-            self.code_lines.append(f'{indent}if {self._translate_condition(rule.condition)}:')
+            self.emit(f'{indent}if {self._translate_condition(rule.condition)}:')
             for r in rule.if_rules: self._generate_rule_code(r, indent_level + 1)
             if rule.else_rules:
-                self.code_lines.append(f'{indent}else:')
+                self.emit(f'{indent}else:')
                 for r in rule.else_rules: self._generate_rule_code(r, indent_level + 1)
             return
         if isinstance(rule, LoopBlock):
             item = rule.item_alias or "item"
             index = rule.index_alias or "i"
-            coll = f'source_item.get("{rule.collection}", [])'
-            self.code_lines.append(f'{indent}for {index}, {item} in enumerate({coll}):')
+            coll = f'_get("{rule.collection}", [])'
+            self.emit(f'{indent}for {index}, {item} in enumerate({coll}):')
             # Save parent context if needed, but for now we just nest
             # To access parent data, we'd need more complex scope handling
             # A simple way is to inject item and index into current scope
-            self.code_lines.append(f'{indent}    # Inner loop item context')
-            self.code_lines.append(f'{indent}    # In a real impl, we\'d want to merge {item} into source_item or use a scope stack')
+            self.emit(f'{indent}    # Inner loop item context')
+            self.emit(f'{indent}    # In a real impl, we\'d want to merge {item} into source_item or use a scope stack')
             for r in rule.rules:
                 # We need to handle source field resolution within loops differently
                 # For now let's just generate nested rules
                 self._generate_rule_code(r, indent_level + 1)
             return
         if isinstance(rule, BreakStatement):
-            self.code_lines.append(f'{indent}break')
+            self.emit(f'{indent}break')
             return
         if isinstance(rule, ContinueStatement):
-            self.code_lines.append(f'{indent}continue')
+            self.emit(f'{indent}continue')
             return
         if isinstance(rule, ObjectBlock):
-            self.code_lines.append(f'{indent}# Object Block: {rule.prefix}')
+            self.emit(f'{indent}# Object Block: {rule.prefix}')
             
             # We need to apply the prefix to all rules inside
             def apply_prefix(r, prefix, is_dyn):
@@ -1190,25 +1547,25 @@ class CodeGenerator:
                 self._generate_rule_code(prefixed_rule, indent_level)
             return
         if isinstance(rule, TryCatchBlock):
-            self.code_lines.append(f'{indent}try:')
+            self.emit(f'{indent}try:')
             for r in rule.try_rules: self._generate_rule_code(r, indent_level + 1)
-            self.code_lines.append(f'{indent}except Exception as {rule.error_var or "e"}:')
+            self.emit(f'{indent}except Exception as {rule.error_var or "e"}:')
             for r in rule.catch_rules: self._generate_rule_code(r, indent_level + 1)
             return
         if isinstance(rule, SwitchCaseBlock):
-            self.code_lines.append(f'{indent}switch_val = source_item.get("{rule.expression}")')
+            self.emit(f'{indent}switch_val = _get("{rule.expression}")')
             for i, (v, rules) in enumerate(rule.cases.items()):
-                self.code_lines.append(f'{indent}{"if" if i==0 else "elif"} switch_val == {repr(v)}:')
+                self.emit(f'{indent}{"if" if i==0 else "elif"} switch_val == {repr(v)}:')
                 for r in rules: self._generate_rule_code(r, indent_level + 1)
             if rule.default_rules:
-                self.code_lines.append(f'{indent}else:')
+                self.emit(f'{indent}else:')
                 for r in rule.default_rules: self._generate_rule_code(r, indent_level + 1)
             return
         if isinstance(rule, MacroCall):
             if rule.name in self.mapping.macros:
                 macro = self.mapping.macros[rule.name]
                 param_map = dict(zip(macro.params, rule.args))
-                self.code_lines.append(f'{indent}# Macro: {rule.name}')
+                self.emit(f'{indent}# Macro: {rule.name}')
                 
                 def apply_substitution(r, p_map):
                     if isinstance(r, MappingRule):
@@ -1235,46 +1592,50 @@ class CodeGenerator:
                     self._generate_rule_code(substituted_rule, indent_level)
             return
         if not isinstance(rule, MappingRule) or not rule.target_field: return
-        if rule.source_field and (rule.source_field.startswith('"') or rule.source_field.startswith("'")):
-            src_var, is_lit = rule.source_field, True
-        else: src_var, is_lit = f'source_item.get("{rule.source_field}")', False
-        val_expr = src_var
-        if rule.transform:
-            f_name = rule.transform.split('(')[0]
-            args_str = rule.transform[len(f_name)+1:-1]
-            if args_str:
-                val_expr = f'transform_value({src_var}, "{f_name}", {args_str}, row_num=row_num, rank_val=rank_val)'
-            else:
-                val_expr = f'transform_value({src_var}, "{f_name}", row_num=row_num, rank_val=rank_val)'
-        if rule.data_type: val_expr = f'{rule.data_type}({val_expr})'
-        target_expr = f'"{rule.target_field}"'
-        if getattr(rule, 'is_dynamic_target', False):
-            # Resolve dynamic field name at runtime
-            self.code_lines.append(f'{indent}target_field_name = str(eval({repr(rule.target_field)}, {{}}, source_item))')
-            target_expr = 'target_field_name'
-            
-        if rule.default_value is not None:
-            self.code_lines.append(f'{indent}set_nested_value(target_item, {target_expr}, {val_expr} if {"True" if is_lit else src_var} else {repr(rule.default_value)})')
-        else:
-            self.code_lines.append(f'{indent}set_nested_value(target_item, {target_expr}, {val_expr})')
+        for line in _render_mapping_rule(rule, indent): self.emit(line)
 
     def _generate_aggregate_rule(self, rule: MappingRule):
-        t, s, f = rule.target_field, rule.source_field, rule.transform or ""
-        if "sum(" in f: self.code_lines.append(f'        set_nested_value(summary, "{t}", sum(float(item.get("{s}", 0)) for item in group))')
-        elif "count(" in f: self.code_lines.append(f'        set_nested_value(summary, "{t}", len(group))')
-        elif "avg(" in f:
-            self.code_lines.append(f'        v = [float(item.get("{s}", 0)) for item in group]')
-            self.code_lines.append(f'        set_nested_value(summary, "{t}", sum(v)/len(v) if v else 0)')
-        elif "min(" in f: self.code_lines.append(f'        set_nested_value(summary, "{t}", min(float(item.get("{s}", 0)) for item in group))')
-        elif "max(" in f: self.code_lines.append(f'        set_nested_value(summary, "{t}", max(float(item.get("{s}", 0)) for item in group))')
-        else: self.code_lines.append(f'        set_nested_value(summary, "{t}", group[0].get("{s}") if group else None)')
+        t, s = rule.target_field, rule.source_field
+        f = rule.transform[0] if rule.transform else ""
+        if f == "sum": self.emit(f'        set_nested_value(summary, "{t}", sum(float(item.get("{s}", 0)) for item in group))')
+        elif f == "count": self.emit(f'        set_nested_value(summary, "{t}", len(group))')
+        elif f == "avg":
+            self.emit(f'        v = [float(item.get("{s}", 0)) for item in group]')
+            self.emit(f'        set_nested_value(summary, "{t}", sum(v)/len(v) if v else 0)')
+        elif f == "min": self.emit(f'        set_nested_value(summary, "{t}", min(float(item.get("{s}", 0)) for item in group))')
+        elif f == "max": self.emit(f'        set_nested_value(summary, "{t}", max(float(item.get("{s}", 0)) for item in group))')
+        else: self.emit(f'        set_nested_value(summary, "{t}", group[0].get("{s}") if group else None)')
 
     def _translate_condition(self, c: str) -> str:
         return c.replace('AND', 'and').replace('OR', 'or').replace('NOT', 'not')
 
 
+# INCLUDE/IMPORT pull in other files, which can change while the including
+# text stays the same, so such mappings bypass the parse cache.
+_INCLUDE_RE = re.compile(r'\b(?:INCLUDE|IMPORT)\b', re.IGNORECASE)
+
+@functools.lru_cache(maxsize=64)
+def _parse_cached(text: str) -> Mapping:
+    """Parse DML text, memoized on the text itself."""
+    return Parser(text).parse()
+
+def _cache_copy(value: Any) -> Any:
+    """Copy of a cached Mapping down to every list, dict and mutable dataclass.
+
+    Frozen MappingRules and plain values are shared with the cache.
+    """
+    if isinstance(value, list):
+        return [_cache_copy(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _cache_copy(v) for k, v in value.items()}
+    if is_dataclass(value) and not type(value).__dataclass_params__.frozen:
+        return replace(value, **{f.name: _cache_copy(getattr(value, f.name)) for f in fields(value)})
+    return value
+
 def parse_dml_file(f: str) -> Mapping:
-    with open(f, 'r') as file: return Parser(file.read()).parse()
+    with open(f, 'r') as file: text = file.read()
+    if _INCLUDE_RE.search(text): return Parser(text).parse()
+    return _cache_copy(_parse_cached(text))
 
 def generate_python_code(m: Mapping) -> str: return CodeGenerator(m).generate()
 
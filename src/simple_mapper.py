@@ -2,48 +2,328 @@
 Simple Data Mapper - Parses DML files and generates executable Python code.
 """
 
+import os
 import re
+import copy
+import hashlib
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+
+# Keyword patterns are case-sensitive and run against an upper-cased copy
+# of the text; captured names are sliced from the original by position.
+_RE_MAPPING = re.compile(r'MAPPING\s+(\w+)')
+_RE_SOURCE = re.compile(r'SOURCE\s+(CSV|XML|DB|EDI)')
+_RE_TARGET = re.compile(r'TARGET\s+(CSV|XML|DB|EDI)')
+_RE_RULES = re.compile(r'RULES\s*\{([^}]*)\}', re.DOTALL)
+# Upper-cases ASCII letters only, so offsets always line up with the original
+_ASCII_UPPER = str.maketrans('abcdefghijklmnopqrstuvwxyz', 'ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+# "#" comments up to the end of the line and /* ... */ block comments;
+# group 1 keeps string literals intact
+_RE_COMMENT = re.compile(r'("(?:[^"\\\n]|\\.)*")|#[^\n]*|/\*[\s\S]*?\*/')
+
+
+def _strip_comment(match: re.Match) -> str:
+    """Keep a string literal; replace a comment by the line breaks it spanned."""
+    return match.group(1) or '\n' * match.group(0).count('\n')
+
+# Single pass over the RULES block. A map statement counts only at the start
+# of a line. TRANSFORM and AS modify the latest map, on its own line or on
+# the continuation lines after it (those starting with a rule modifier); any
+# other statement, or a stray mid-line "map", ends that rule. String literals
+# are matched only so that their contents are skipped.
+_RE_RULE_TOKEN = re.compile(
+    r'^\s*map\s+(?P<src>\w+)\s*->\s*(?P<tgt>\w+)'
+    r'|\bTRANSFORM\s+(?P<xf>\w+)\s*\('
+    r'|\bAS\s+(?P<as_>\w+)'
+    r'|(?P<end>\bmap\b|^[ \t]*(?!(?:TRANSFORM|AS|IF|DEFAULT|ELSE)\b)\w)'
+    r'|(?P<str>"(?:[^"\\\n]|\\.)*")',
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# AS types that transform_value can apply
+_CASTS = {'int': 'int', 'integer': 'int', 'float': 'float', 'decimal': 'float'}
+
+
+# Templates for the generated module. Each chunk ends with the newline
+# that separates it from the next one.
+_TPL_HEADER = '''\
+#!/usr/bin/env python3
+# Data Mapping: {name}
+
+{imports}import csv
 from typing import Dict, List
 
+'''
+
+_TPL_TRANSFORM = '''\
+# Transformation Functions
+_TRANSFORMS = {
+    "upper": lambda v: str(v).upper(),
+    "lower": lambda v: str(v).lower(),
+    "trim": lambda v: str(v).strip(),
+    "int": int,
+    "float": float,
+}
+
+
+def transform_value(value, func_name: str):
+    """Apply transformation function to value."""
+    if value is None:
+        return None
+    fn = _TRANSFORMS.get(func_name)
+    if fn is None:
+        return value
+    try:
+        return fn(value)
+    except Exception:
+        return value
+
+'''
+
+# Shared by every CSV read: blank lines are skipped and each row is cut or
+# padded to one slot past the header, which always holds None. Short rows
+# thus read as None, as with DictReader, and a missing column can point at
+# that slot.
+_TPL_READ_CSV = '''\
+def _csv_rows(f):
+    """Header and padded rows of an open CSV file."""
+    reader = csv.reader(f)
+    header = next(reader, [])
+    width = len(header)
+    pad = [None] * (width + 1)
+
+    def rows():
+        for row in reader:
+            if not row:
+                continue
+            if len(row) == width:
+                row.append(None)
+            else:
+                row = (row[:width] + pad)[:width + 1]
+            yield row
+
+    return header, rows()
+
+
+def iter_source(file_path: str, fields=None):
+    """Yield CSV rows one at a time, as dicts of the requested fields (default all)."""
+    with open(file_path, "r", newline="") as f:
+        header, rows = _csv_rows(f)
+        index = {name: i for i, name in enumerate(header)}
+        columns = [(name, index[name]) for name in (header if fields is None else fields)
+                   if name in index]
+        for row in rows:
+            yield {name: row[i] for name, i in columns}
+
+
+def read_source(file_path: str, fields=None) -> List[Dict]:
+    """Read CSV file."""
+    return list(iter_source(file_path, fields))
+
+'''
+
+_TPL_READ_XML = '''\
+def iter_source(file_path: str):
+    """Yield XML items one at a time."""
+    tree = ET.parse(file_path)
+    root = tree.getroot()
+    for elem in root.iter("Item"):
+        yield {child.tag: child.text for child in elem}
+
+
+def read_source(file_path: str) -> List[Dict]:
+    """Read XML file."""
+    return list(iter_source(file_path))
+
+'''
+
+_TPL_READ_NONE = '''\
+def iter_source(file_path: str):
+    return iter(())
+
+
+def read_source(file_path: str) -> List[Dict]:
+    return []
+
+'''
+
+_TPL_WRITE_CSV = '''\
+def write_target(items: List[Dict], output_path: str):
+    """Write CSV file."""
+    items = iter(items)
+    first = next(items, None)
+    if first is None:
+        return
+    with open(output_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(first.keys()))
+        writer.writeheader()
+        writer.writerow(first)
+        writer.writerows(items)
+
+'''
+
+_TPL_WRITE_XML = '''\
+def write_target(items: List[Dict], output_path: str):
+    """Write XML file."""
+    root = ET.Element("Root")
+    for item in items:
+        elem = ET.SubElement(root, "Item")
+        for key, value in item.items():
+            child = ET.SubElement(elem, key)
+            child.text = str(value) if value else ""
+    ET.ElementTree(root).write(output_path, encoding="utf-8", xml_declaration=True)
+
+'''
+
+_TPL_WRITE_NONE = '''\
+def write_target(items: List[Dict], output_path: str):
+    pass
+
+'''
+
+_READER_TEMPLATES: Dict[str, str] = {'CSV': _TPL_READ_CSV, 'XML': _TPL_READ_XML}
+_WRITER_TEMPLATES: Dict[str, str] = {'CSV': _TPL_WRITE_CSV, 'XML': _TPL_WRITE_XML}
+
+# Extra imports the readers/writers of each type need, in emission order.
+_TYPE_IMPORTS: Dict[str, str] = {
+    'XML': 'import xml.etree.ElementTree as ET\n',
+    'DB': 'import sqlite3\n',
+}
+
+# Rows are read, mapped and handed to write_target one at a time; with
+# return_items=False nothing is collected along the way.
+_TPL_ROWS = '''\
+def _iter_rows(input_file: str):
+    """Map source rows one at a time."""
+    for item in iter_source({source_args}):
+'''
+
+_TPL_MAIN = '''
+def execute_mapping(input_file: str, output_file: str, return_items: bool = True) -> List[Dict]:
+    """Execute the mapping."""
+    if not return_items:
+        write_target(_iter_rows(input_file), output_file)
+        return None
+    output_items = list(_iter_rows(input_file))
+    write_target(output_items, output_file)
+    return output_items
+
+'''
+
+# CSV to CSV: source positions are bound to locals once and each output row
+# is a single tuple literal over them, written straight to csv.writer. The
+# dicts execute_mapping returns are only built when return_items is set.
+_TPL_MAIN_CSV = '''\
+def _iter_values(input_file: str):
+    """Yield each output row as a tuple, reading source fields by position."""
+    with open(input_file, "r", newline="") as f:
+        header, rows = _csv_rows(f)
+        index = {{name: i for i, name in enumerate(header)}}
+        [{names}] = [index.get(name, len(header)) for name in {sources!r}]
+        for row in rows:
+            yield ({values},)
+
+
+def execute_mapping(input_file: str, output_file: str, return_items: bool = True) -> List[Dict]:
+    """Execute the mapping."""
+    out_header = {targets!r}
+    rows = _iter_values(input_file)
+    if return_items:
+        rows = list(rows)
+    values = iter(rows)
+    first = next(values, None)
+    if first is not None:
+        with open(output_file, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(out_header)
+            writer.writerow(first)
+            writer.writerows(values)
+    if not return_items:
+        return None
+    return [dict(zip(out_header, row)) for row in rows]
+
+'''
+
+_TPL_ENTRY = '''\
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) >= 3:
+        result = execute_mapping(sys.argv[1], sys.argv[2])
+        print(f"Done: {len(result)} items")
+    else:
+        print("Usage: python mapper.py <input> <output>")'''
+
+
+def _value_expr(rule: Dict, expr: str = '') -> str:
+    """Generated expression for one rule's output value (from expr, default the row lookup)."""
+    expr = expr or f'item.get("{rule["source"]}")'
+    if 'transform' in rule:
+        expr = f'transform_value({expr}, "{rule["transform"]}")'
+    if rule.get('type') in _CASTS:
+        expr = f'transform_value({expr}, "{_CASTS[rule["type"]]}")'
+    return expr
+
+
+def _is_passthrough(rules: List[Dict]) -> bool:
+    """Whether every rule copies its source field unchanged."""
+    return all(_value_expr(r, 'v') == 'v' for r in rules)
+
 
 class SimpleMapper:
     """Simple mapper implementation."""
+    __slots__ = ('source_type', 'target_type', 'rules', '_code_cache')
     
     def __init__(self):
         self.source_type = "CSV"
         self.target_type = "CSV"
         self.rules = []
+        # (name, source type, target type, rule items) -> generated code
+        self._code_cache: Dict[Tuple, str] = {}
         
     def parse_mapping(self, text: str) -> Dict:
         """Parse a simple mapping definition."""
+        if '#' in text or '/*' in text:
+            text = _RE_COMMENT.sub(_strip_comment, text)
+        # str.upper() keeps offsets only for ASCII (e.g. 'ß' becomes 'SS')
+        upper = text.upper() if text.isascii() else text.translate(_ASCII_UPPER)
+        
         # Extract mapping name
-        match = re.search(r'MAPPING\s+(\w+)', text, re.IGNORECASE)
-        name = match.group(1) if match else "unnamed"
+        match = _RE_MAPPING.search(upper)
+        name = text[match.start(1):match.end(1)] if match else "unnamed"
         
         # Extract source type
-        match = re.search(r'SOURCE\s+(CSV|XML|DB|EDI)', text, re.IGNORECASE)
+        match = _RE_SOURCE.search(upper)
         if match:
-            self.source_type = match.group(1).upper()
+            self.source_type = match.group(1)
         
         # Extract target type  
-        match = re.search(r'TARGET\s+(CSV|XML|DB|EDI)', text, re.IGNORECASE)
+        match = _RE_TARGET.search(upper)
         if match:
-            self.target_type = match.group(1).upper()
+            self.target_type = match.group(1)
         
         # Extract RULES block content
-        rules_match = re.search(r'RULES\s*\{([^}]*)\}', text, re.IGNORECASE | re.DOTALL)
-        rules_content = rules_match.group(1) if rules_match else ""
+        rules_match = _RE_RULES.search(upper)
+        rules_content = text[rules_match.start(1):rules_match.end(1)] if rules_match else ""
         
-        # Extract map statements from RULES block
+        # Extract map statements (map source -> target [TRANSFORM f()] [AS type])
         self.rules = []
-        for line in rules_content.split('\n'):
-            # Match map statement: map source -> target
-            map_match = re.match(r'\s*map\s+(\w+)\s*->\s*(\w+)', line, re.IGNORECASE)
-            if map_match:
-                self.rules.append({
-                    'source': map_match.group(1),
-                    'target': map_match.group(2)
-                })
+        rule = None
+        for m in _RE_RULE_TOKEN.finditer(rules_content):
+            kind = m.lastgroup
+            if kind == 'tgt':
+                rule = {'source': m.group('src'), 'target': m.group('tgt')}
+                self.rules.append(rule)
+            elif kind == 'end':
+                rule = None
+            elif kind == 'str':
+                continue
+            elif rule is not None:
+                if kind == 'xf':
+                    rule['transform'] = m.group('xf').lower()
+                else:
+                    rule['type'] = m.group('as_').lower()
         
         return {
             'name': name,
@@ -54,145 +334,152 @@ class SimpleMapper:
     
     def generate_code(self, mapping: Dict) -> str:
         """Generate Python code from mapping."""
-        lines = []
-        
-        # Header
-        lines.append('#!/usr/bin/env python3')
-        lines.append(f'# Data Mapping: {mapping["name"]}')
-        lines.append('')
-        
-        # Imports
-        if self.source_type == 'XML' or self.target_type == 'XML':
-            lines.append('import xml.etree.ElementTree as ET')
-        if self.source_type == 'DB' or self.target_type == 'DB':
-            lines.append('import sqlite3')
-        lines.append('import csv')
-        lines.append('')
-        
-        # Transform functions
-        lines.append('# Transformation Functions')
-        lines.append('def transform_value(value, func_name: str):')
-        lines.append('    """Apply transformation function to value."""')
-        lines.append('    if value is None:')
-        lines.append('        return None')
-        lines.append('    try:')
-        lines.append('        if func_name == "upper":')
-        lines.append('            return str(value).upper()')
-        lines.append('        elif func_name == "lower":')
-        lines.append('            return str(value).lower()')
-        lines.append('        elif func_name == "trim":')
-        lines.append('            return str(value).strip()')
-        lines.append('        elif func_name == "int":')
-        lines.append('            return int(value)')
-        lines.append('        elif func_name == "float":')
-        lines.append('            return float(value)')
-        lines.append('    except Exception:')
-        lines.append('        pass')
-        lines.append('    return value')
-        lines.append('')
-        
-        # Source reader
-        if self.source_type == 'CSV':
-            lines.append('def read_source(file_path: str) -> List[Dict]:')
-            lines.append('    """Read CSV file."""')
-            lines.append('    items = []')
-            lines.append('    with open(file_path, "r", newline="") as f:')
-            lines.append('        reader = csv.DictReader(f)')
-            lines.append('        for row in reader:')
-            lines.append('            items.append(dict(row))')
-            lines.append('    return items')
-        elif self.source_type == 'XML':
-            lines.append('def read_source(file_path: str) -> List[Dict]:')
-            lines.append('    """Read XML file."""')
-            lines.append('    tree = ET.parse(file_path)')
-            lines.append('    root = tree.getroot()')
-            lines.append('    items = []')
-            lines.append('    for elem in root.iter("Item"):')
-            lines.append('        item = {child.tag: child.text for child in elem}')
-            lines.append('        items.append(item)')
-            lines.append('    return items')
-        else:
-            lines.append('def read_source(file_path: str) -> List[Dict]:')
-            lines.append('    return []')
-        lines.append('')
-        
-        # Target writer
-        if self.target_type == 'CSV':
-            lines.append('def write_target(items: List[Dict], output_path: str):')
-            lines.append('    """Write CSV file."""')
-            lines.append('    if not items:')
-            lines.append('        return')
-            lines.append('    fieldnames = list(items[0].keys())')
-            lines.append('    with open(output_path, "w", newline="") as f:')
-            lines.append('        writer = csv.DictWriter(f, fieldnames=fieldnames)')
-            lines.append('        writer.writeheader()')
-            lines.append('        for item in items:')
-            lines.append('            writer.writerow(item)')
-        elif self.target_type == 'XML':
-            lines.append('def write_target(items: List[Dict], output_path: str):')
-            lines.append('    """Write XML file."""')
-            lines.append('    root = ET.Element("Root")')
-            lines.append('    for item in items:')
-            lines.append('        elem = ET.SubElement(root, "Item")')
-            lines.append('        for key, value in item.items():')
-            lines.append('            child = ET.SubElement(elem, key)')
-            lines.append('            child.text = str(value) if value else ""')
-            lines.append('    ET.ElementTree(root).write(output_path, encoding="utf-8", xml_declaration=True)')
-        else:
-            lines.append('def write_target(items: List[Dict], output_path: str):')
-            lines.append('    pass')
-        lines.append('')
-        
-        # Main function
-        lines.append('def execute_mapping(input_file: str, output_file: str) -> List[Dict]:')
-        lines.append('    """Execute the mapping."""')
-        lines.append('    source_items = read_source(input_file)')
-        lines.append('    output_items = []')
-        
-        # Generate rules - create single output item with all mapped fields
-        lines.append('    for item in source_items:')
-        if mapping.get('rules'):
-            lines.append('        output_item = {')
-            for i, rule in enumerate(mapping.get('rules', [])):
-                src = rule['source']
-                tgt = rule['target']
-                comma = ',' if i < len(mapping.get('rules', [])) - 1 else ''
-                lines.append(f'            "{tgt}": item.get("{src}"){comma}')
-            lines.append('        }')
-            lines.append('        output_items.append(output_item)')
+        key = (mapping["name"], self.source_type, self.target_type,
+               tuple(tuple(r.items()) for r in mapping.get('rules') or ()))
+        code = self._code_cache.get(key)
+        if code is None:
+            code = self._code_cache[key] = self._render(mapping)
+        return code
+
+    def _render(self, mapping: Dict) -> str:
+        """Build the generated module's source text."""
+        types = (self.source_type, self.target_type)
+        imports = ''.join(line for kind, line in _TYPE_IMPORTS.items() if kind in types)
+        reader = _READER_TEMPLATES.get(self.source_type, _TPL_READ_NONE)
+        writer = _WRITER_TEMPLATES.get(self.target_type, _TPL_WRITE_NONE)
+
+        rules = mapping.get('rules')
+        if rules and types == ('CSV', 'CSV'):
+            main = (self._csv_main(rules),)
         else:
-            lines.append('        pass')  # No rules, just pass
-        
-        lines.append('    write_target(output_items, output_file)')
-        lines.append('    return output_items')
-        lines.append('')
-        
-        # Entry point
-        lines.append('if __name__ == "__main__":')
-        lines.append('    import sys')
-        lines.append('    if len(sys.argv) >= 3:')
-        lines.append('        result = execute_mapping(sys.argv[1], sys.argv[2])')
-        lines.append('        print(f"Done: {len(result)} items")')
-        lines.append('    else:')
-        lines.append('        print("Usage: python mapper.py <input> <output>")')
-        
-        return '\n'.join(lines)
+            main = (self._row_keys(rules), _TPL_ROWS.format(source_args=self._source_args(rules)),
+                    self._row_body(rules), _TPL_MAIN)
+
+        # Each piece is finished source text, so a single join copies it once
+        return ''.join((
+            _TPL_HEADER.format(name=mapping["name"], imports=imports),
+            _TPL_TRANSFORM, reader, writer, *main, _TPL_ENTRY,
+        ))
+
+    def _source_args(self, rules: List[Dict]) -> str:
+        """Arguments for read_source: CSV sources only read the mapped columns."""
+        if self.source_type != 'CSV':
+            return 'input_file'
+        fields = tuple(dict.fromkeys(r['source'] for r in rules or ()))
+        return f'input_file, {fields!r}'
+
+    def _copies_rows(self, rules: List[Dict]) -> bool:
+        """Whether CSV rows map onto themselves: every rule copies a field to the same name."""
+        return (self.source_type == 'CSV' and bool(rules) and _is_passthrough(rules)
+                and all(r['source'] == r['target'] for r in rules))
+
+    def _row_keys(self, rules: List[Dict]) -> str:
+        """Module-level key tuples for a mapping whose rules only copy fields."""
+        if not rules or not _is_passthrough(rules):
+            return ''
+        if self._copies_rows(rules):
+            keys = tuple(dict.fromkeys(r['target'] for r in rules))
+            return f'_KEYS = {keys!r}\n\n'
+        sources = tuple(r['source'] for r in rules)
+        targets = tuple(r['target'] for r in rules)
+        return f'_SRC_KEYS = {sources!r}\n_TGT_KEYS = {targets!r}\n\n'
+
+    def _row_body(self, rules: List[Dict]) -> str:
+        """Loop body of _iter_rows: yields one output item with all mapped fields."""
+        if self._copies_rows(rules):
+            # iter_source already yields just these columns in this order, so a
+            # complete row is the output item; missing columns are added as None
+            return '        yield item if len(item) == len(_KEYS) else {**dict.fromkeys(_KEYS), **item}\n'
+        if rules and _is_passthrough(rules):
+            # All lookups in one C-level map; .get keeps missing fields as None
+            return '        yield dict(zip(_TGT_KEYS, map(item.get, _SRC_KEYS)))\n'
+        if rules:
+            # Every entry carries its own trailing comma, which is legal in a dict display
+            fields = ''.join(f'            "{r["target"]}": {_value_expr(r)},\n' for r in rules)
+            return f'        yield {{\n{fields}        }}\n'
+        # No rules: the source is still read, but there are no output items
+        return '        pass\n    return iter(())\n'
+
+
+    def _csv_main(self, rules: List[Dict]) -> str:
+        """_iter_values and execute_mapping for CSV to CSV."""
+        # Same key order and last-rule-wins values as the per-row dict display
+        final = {}
+        for rule in rules:
+            final[rule['target']] = rule
+        names = [f'i{n}' for n in range(len(final))]
+        values = [_value_expr(rule, f'row[{name}]') for name, rule in zip(names, final.values())]
+        return _TPL_MAIN_CSV.format(
+            sources=tuple(r['source'] for r in final.values()), names=', '.join(names),
+            values=', '.join(values), targets=tuple(final))
+
+
+def _digest(data: bytes) -> bytes:
+    """Short content hash used to tell whether generated code changed."""
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+@functools.lru_cache(maxsize=128)
+def _compile_text(content: str) -> Tuple[Dict, bytes, bytes]:
+    """Parse DML text and return (mapping, UTF-8 code, digest); cached, so callers must not mutate the mapping."""
+    mapper = SimpleMapper()
+    mapping = mapper.parse_mapping(content)
+    data = mapper.generate_code(mapping).encode('utf-8')
+    return mapping, data, _digest(data)
+
+
+# output path -> (digest of the code last written there, (size, mtime_ns) after the write)
+_WRITTEN: Dict[str, Tuple[bytes, Tuple[int, int]]] = {}
+
+
+def _is_current(output_file: str, digest: bytes) -> bool:
+    """Whether output_file already holds the code with this digest."""
+    try:
+        st = os.stat(output_file)
+    except FileNotFoundError:
+        return False
+    recorded = _WRITTEN.get(output_file)
+    if recorded is not None and recorded[1] == (st.st_size, st.st_mtime_ns):
+        # Untouched since we wrote it: no need to read it back
+        return recorded[0] == digest
+    with open(output_file, 'rb') as f:
+        return _digest(f.read()) == digest
 
 
 def compile_mapping(input_file: str, output_file: str) -> Dict:
     """Compile a mapping file."""
-    with open(input_file, 'r') as f:
-        content = f.read()
+    with open(input_file, 'rb') as f:
+        content = f.read().decode('utf-8')
+    if '\r' in content:
+        # Same line endings text mode would have given
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
     
-    mapper = SimpleMapper()
-    mapping = mapper.parse_mapping(content)
-    code = mapper.generate_code(mapping)
+    mapping, data, digest = _compile_text(content)
     
-    with open(output_file, 'w') as f:
-        f.write(code)
+    # Leave an up-to-date output file untouched; the code is written as encoded
+    if not _is_current(output_file, digest):
+        with open(output_file, 'wb') as f:
+            f.write(data)
+        st = os.stat(output_file)
+        _WRITTEN[output_file] = (digest, (st.st_size, st.st_mtime_ns))
     
     print(f"Mapping compiled to {output_file}")
-    return mapping
+    return copy.deepcopy(mapping)
+
+
+def _compile_pair(pair: Tuple[str, str]) -> Dict:
+    """compile_mapping for one (input, output) pair; module-level so it pickles."""
+    return compile_mapping(*pair)
+
+
+def compile_many(pairs: List[Tuple[str, str]]) -> List[Dict]:
+    """Compile independent (input_file, output_file) pairs across processes, in order."""
+    pairs = list(pairs)
+    if len(pairs) < 2:
+        return [_compile_pair(pair) for pair in pairs]
+    workers = os.cpu_count() or 1
+    with ProcessPoolExecutor() as ex:
+        return list(ex.map(_compile_pair, pairs, chunksize=max(1, len(pairs) // (workers * 4))))
 
 
 if __name__ == "__main__":
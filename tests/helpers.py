@@ -0,0 +1,25 @@
+"""Shared helpers for the test suites."""
+
+import os
+import tempfile
+
+
+def run_generated_code(code, csv_text, **kwargs):
+    """Exec generated mapping code and run execute_mapping on csv_text.
+
+    Returns the execute_mapping result and the output file contents (None if
+    nothing was written).
+    """
+    namespace = {'__name__': 'generated_mapping'}
+    exec(compile(code, 'generated_mapping.py', 'exec'), namespace)
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'input.csv')
+        output_file = os.path.join(tmp, 'output')
+        with open(input_file, 'w', newline='') as f:
+            f.write(csv_text)
+        result = namespace['execute_mapping'](input_file, output_file, **kwargs)
+        output = None
+        if os.path.exists(output_file):
+            with open(output_file, newline='') as f:
+                output = f.read()
+    return result, output
@@ -5,11 +5,12 @@ Tests parsing and code generation functionality.
 
 import sys
 import os
+import tempfile
 
 # Add parent directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from src.mapper import Parser, CodeGenerator, parse_dml_file, generate_python_code
+from src.mapper import Parser, CodeGenerator, Tokenizer, parse_dml_file, generate_python_code
 
 
 def test_simple_csv_to_csv():
@@ -221,6 +222,106 @@ MAPPING xml_target_test {
     return mapping
 
 
+def test_parse_cache_returns_independent_copies():
+    """Test that mutating a parsed mapping does not leak into the parse cache."""
+    dml_code = """
+MAPPING cache_test {
+    SOURCE CSV {
+        file: "input.csv"
+    }
+    
+    TARGET CSV {
+        file: "output.csv"
+    }
+    
+    RULES {
+        map name -> full_name
+    }
+}
+"""
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'cache_test.map')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(dml_code)
+        first = parse_dml_file(path)
+        first['rules'].clear()
+        first['target']['config']['file'] = 'changed.csv'
+        second = parse_dml_file(path)
+    
+    assert len(second['rules']) == 1
+    assert second['target']['config']['file'] == 'output.csv'
+    
+    print("✓ Parse cache copy test passed")
+
+
+def test_number_values():
+    """Test that plain numbers parse as int/float while digit-led paths stay names."""
+    dml_code = """
+MAPPING number_test {
+    SOURCE DB {
+        port: 5432
+        ratio: 1.5
+    }
+    
+    TARGET CSV {
+        file: "output.csv"
+    }
+    
+    RULES {
+        map amount -> total DEFAULT 0
+        map 1000/OrderID -> order_id
+    }
+}
+"""
+    
+    parser = Parser(dml_code)
+    mapping = parser.parse()
+    
+    assert mapping['sources'][0]['config'] == {'port': 5432, 'ratio': 1.5}
+    assert mapping['rules'][0].default_value == 0
+    assert mapping['rules'][1].source_field == "1000/OrderID"
+    
+    kinds = [token[0] for token in Tokenizer("1000/OrderID 12 3.5").tokenize()]
+    assert kinds == ['IDENT', 'NUMBER', 'NUMBER']
+    
+    print("✓ Number value test passed")
+
+
+def test_xml_source_nested_order():
+    """Test that the streamed XML reader keeps root.iter() order for nested matches."""
+    dml_code = """
+MAPPING xml_order_test {
+    SOURCE XML {
+        file: "input.xml"
+        root_element: "Item"
+    }
+    
+    TARGET CSV {
+        file: "output.csv"
+    }
+    
+    RULES {
+        map id -> Id
+    }
+}
+"""
+    
+    namespace = {'__name__': 'generated_mapping'}
+    exec(compile(generate_python_code(Parser(dml_code).parse()), 'generated_mapping.py', 'exec'), namespace)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'input.xml')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('<Root><Item><id>1</id><Item><id>9</id></Item></Item>'
+                    '<Group><Item><id>2</id></Item></Group></Root>')
+        items = list(namespace['read_xml_source'](path, root_element="Item"))
+    
+    assert items == [{'id': '1', 'Item': None}, {'id': '9'}, {'id': '2'}]
+    
+    print("✓ XML source order test passed")
+
+
 def run_all_tests():
     """Run all tests."""
     print("=" * 50)
@@ -234,6 +335,9 @@ def run_all_tests():
         test_with_conditions,
         test_db_source,
         test_xml_target,
+        test_parse_cache_returns_independent_copies,
+        test_number_values,
+        test_xml_source_nested_order,
     ]
     
     passed = 0
@@ -0,0 +1,323 @@
+"""
+Test suite for the DML parser in src/parser.py.
+Tests parsing and runs the generated mapping code.
+"""
+
+import sys
+import os
+import sqlite3
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.parser import Parser, Tokenizer, generate_python_code, parse_dml_file
+from tests.helpers import run_generated_code
+
+
+SAMPLE_CSV = "id,name,amount\n1, alice ,10\n2,bob,20\n"
+
+
+def run_generated(dml_code, csv_text=SAMPLE_CSV, **kwargs):
+    """Generate code for dml_code and run it on csv_text."""
+    return run_generated_code(generate_python_code(Parser(dml_code).parse()), csv_text, **kwargs)
+
+
+def test_stream_object_with_try():
+    """Test streaming an OBJECT block whose TRY rules keep their own targets."""
+    dml_code = """
+MAPPING object_try_test {
+    SOURCE CSV { file: "input.csv" }
+    TARGET CSV { file: "output.csv" }
+    RULES {
+        OBJECT cust {
+            TRY { map id -> cid }
+            CATCH { map name -> cname }
+        }
+    }
+}
+"""
+
+    result, output = run_generated(dml_code, return_items=False)
+
+    assert result is None
+    assert output.splitlines() == ["cid,cname", "1,", "2,"]
+
+    print("✓ OBJECT with TRY stream test passed")
+
+
+def test_stream_header_matches_collected():
+    """Test that return_items does not change the CSV header."""
+    dml_code = """
+MAPPING if_else_header_test {
+    SOURCE CSV { file: "input.csv" }
+    TARGET CSV { file: "output.csv" }
+    RULES {
+        IF row_num > 1 { map id -> X } ELSE { map name -> Y }
+        map amount -> Z
+    }
+}
+"""
+
+    collected = run_generated(dml_code)[1]
+    streamed = run_generated(dml_code, return_items=False)[1]
+
+    assert collected == streamed
+    assert collected.splitlines()[0] == "X,Y,Z"
+
+    print("✓ Stream header test passed")
+
+
+def test_stream_columnar_mapping():
+    """Test that return_items=False also streams on the column-wise path."""
+    dml_code = """
+MAPPING columnar_stream_test {
+    SOURCE CSV { file: "input.csv" }
+    TARGET CSV { file: "output.csv" }
+    RULES {
+        map id -> Id
+        map name -> Name TRANSFORM upper()
+    }
+}
+"""
+
+    result, streamed = run_generated(dml_code, return_items=False)
+    items, collected = run_generated(dml_code)
+
+    assert result is None
+    assert streamed == collected
+    assert items == [{'Id': '1', 'Name': ' ALICE '}, {'Id': '2', 'Name': 'BOB'}]
+
+    print("✓ Column-wise stream test passed")
+
+
+def test_if_condition_reads_unmapped_column():
+    """Test that an IF condition can read a column no rule maps."""
+    dml_code = """
+MAPPING if_projection_test {
+    SOURCE CSV { file: "input.csv" }
+    TARGET CSV { file: "output.csv" }
+    RULES {
+        IF source_item["status"] == "A" { map id -> Id } ELSE { map name -> Name }
+    }
+}
+"""
+
+    result, output = run_generated(dml_code, csv_text="id,name,status\n1,alice,A\n2,bob,B\n")
+
+    assert result == [{'Id': '1'}, {'Name': 'bob'}]
+    assert output.splitlines() == ["Id,Name", "1,", ",bob"]
+
+    print("✓ IF condition projection test passed")
+
+
+def test_declared_columns_header():
+    """Test that declared columns skip a header row unless has_header is false."""
+    dml_code = """
+MAPPING declared_columns_test {
+    SOURCE CSV { file: "input.csv" columns: "id,name,amount" %s }
+    TARGET CSV { file: "output.csv" }
+    RULES { map id -> Id }
+}
+"""
+
+    with_header = run_generated(dml_code % "")[0]
+    without_header = run_generated(dml_code % "has_header: false", csv_text="1,alice,10\n2,bob,20\n")[0]
+
+    assert with_header == [{'Id': '1'}, {'Id': '2'}]
+    assert without_header == [{'Id': '1'}, {'Id': '2'}]
+
+    print("✓ Declared columns header test passed")
+
+
+def test_rule_render_keeps_value_types():
+    """Test that rules differing only in value type do not share rendered code."""
+    dml_code = """
+MAPPING default_type_test {
+    SOURCE CSV { file: "input.csv" }
+    TARGET CSV { file: "output.csv" }
+    RULES { OBJECT o { map amount -> total DEFAULT %s } }
+}
+"""
+
+    as_int = generate_python_code(Parser(dml_code % "1").parse())
+    as_float = generate_python_code(Parser(dml_code % "1.0").parse())
+
+    assert 'else 1)' in as_int
+    assert 'else 1.0)' in as_float
+
+    print("✓ Rule render value type test passed")
+
+
+def test_db_target_quotes_and_type_guard():
+    """Test that the DB writer quotes identifiers and refuses non-sqlite types."""
+    dml_code = """
+MAPPING db_target_test {
+    SOURCE CSV { file: "input.csv" }
+    TARGET DB { type: "%s" connection_string: "%s" table: "order items" }
+    RULES {
+        map id -> order
+        map name -> from
+    }
+}
+"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'out.db')
+        run_generated(dml_code % ("sqlite", db_path))
+        conn = sqlite3.connect(db_path)
+        rows = conn.execute('SELECT "order", "from" FROM "order items"').fetchall()
+        conn.close()
+
+        try:
+            run_generated(dml_code % ("postgres", db_path))
+            raise AssertionError("postgres target did not raise")
+        except NotImplementedError:
+            pass
+
+    assert rows == [('1', ' alice '), ('2', 'bob')]
+
+    print("✓ DB target test passed")
+
+
+def test_parse_cache_returns_independent_copies():
+    """Test that mutating a parsed mapping does not leak into the parse cache."""
+    dml_code = """
+MAPPING cache_test {
+    SOURCE CSV { file: "input.csv" }
+    TARGET CSV { file: "output.csv" }
+    RULES {
+        IF amount > 10 { map id -> big_id }
+        map name -> full_name
+    }
+}
+"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'cache_test.map')
+        with open(path, 'w') as f:
+            f.write(dml_code)
+        first = parse_dml_file(path)
+        first.rules[0].if_rules.clear()
+        first.rules.clear()
+        first.target.config['file'] = 'changed.csv'
+        second = parse_dml_file(path)
+
+    assert len(second.rules) == 2
+    assert len(second.rules[0].if_rules) == 1
+    assert second.target.config['file'] == 'output.csv'
+
+    print("✓ Parse cache copy test passed")
+
+
+def test_comparison_operators():
+    """Test that two-character operators lex as single tokens."""
+    tokens = [token[:2] for token in Tokenizer("amount >= 10 <= x == y != z -3").tokenize()]
+
+    assert tokens == [
+        ('IDENT', 'amount'), ('GE', '>='), ('NUMBER', '10'), ('LE', '<='), ('IDENT', 'x'),
+        ('EQ', '=='), ('IDENT', 'y'), ('NE', '!='), ('IDENT', 'z'), ('NUMBER', '-3'),
+    ]
+
+    mapping = Parser("""
+MAPPING condition_test {
+    SOURCE CSV { file: "input.csv" }
+    TARGET CSV { file: "output.csv" }
+    RULES { map status -> Status IF amount >= 10 }
+}
+""").parse()
+    assert mapping.rules[0].condition == "amount >= 10"
+
+    print("✓ Comparison operator test passed")
+
+
+def test_keyword_promotion():
+    """Test that keywords are matched case-insensitively and only as whole words."""
+    tokens = [token[:2] for token in Tokenizer("mapping Mapping RuLes map_name Target/Value").tokenize()]
+
+    assert tokens == [
+        ('MAPPING', 'mapping'), ('MAPPING', 'Mapping'), ('RULES', 'RuLes'),
+        ('IDENT', 'map_name'), ('SLASHPATH', 'Target/Value'),
+    ]
+
+    mapping = Parser("""
+mapping lower_case {
+    source csv { file: "input.csv" }
+    target csv { file: "output.csv" }
+    rules { map source_name -> target_name }
+}
+""").parse()
+    assert mapping.name == "lower_case"
+    assert mapping.rules[0].source_field == "source_name"
+
+    print("✓ Keyword promotion test passed")
+
+
+def test_generated_transform_table():
+    """Test that the generated _TRANSFORMS table applies transforms and passes unknown names through."""
+    dml_code = """
+MAPPING transform_run_test {
+    SOURCE CSV { file: "input.csv" }
+    TARGET CSV { file: "output.csv" }
+    RULES {
+        map name -> Name TRANSFORM trim()
+        map name -> Upper TRANSFORM upper()
+        map id -> Row TRANSFORM row_number()
+        map amount -> Amount AS float
+        map id -> Same TRANSFORM no_such_transform()
+    }
+}
+"""
+
+    result, output = run_generated(dml_code)
+
+    assert result == [
+        {'Name': 'alice', 'Upper': ' ALICE ', 'Row': 1, 'Amount': 10.0, 'Same': '1'},
+        {'Name': 'bob', 'Upper': 'BOB', 'Row': 2, 'Amount': 20.0, 'Same': '2'},
+    ]
+    assert output.splitlines()[0] == "Name,Upper,Row,Amount,Same"
+
+    print("✓ Generated transform table test passed")
+
+
+def run_all_tests():
+    """Run all tests."""
+    print("=" * 50)
+    print("Running DML Parser Tests")
+    print("=" * 50)
+
+    tests = [
+        test_stream_object_with_try,
+        test_stream_header_matches_collected,
+        test_stream_columnar_mapping,
+        test_if_condition_reads_unmapped_column,
+        test_declared_columns_header,
+        test_rule_render_keeps_value_types,
+        test_db_target_quotes_and_type_guard,
+        test_parse_cache_returns_independent_copies,
+        test_comparison_operators,
+        test_keyword_promotion,
+        test_generated_transform_table,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__} failed: {e}")
+            failed += 1
+
+    print("=" * 50)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 50)
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
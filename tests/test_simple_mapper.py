@@ -4,6 +4,16 @@ import sys
 sys.path.insert(0, '.')
 
 from src.simple_mapper import SimpleMapper
+from tests.helpers import run_generated_code
+
+
+SAMPLE_CSV = "id,name,price\n1, widget ,2.5\n\n2,gadget\n"
+
+
+def run_generated(dml, csv_text=SAMPLE_CSV, **kwargs):
+    """Generate code for dml and run it on csv_text."""
+    mapper = SimpleMapper()
+    return run_generated_code(mapper.generate_code(mapper.parse_mapping(dml)), csv_text, **kwargs)
 
 
 def test_csv_to_xml():
@@ -143,6 +153,135 @@ def test_with_transform():
     print("✓ Transform test passed")
 
 
+def test_transform_on_next_line():
+    """Test TRANSFORM and AS written on the lines after their map."""
+    dml = '''MAPPING next_line_test {
+        SOURCE CSV { file: "input.csv" }
+        TARGET XML { file: "output.xml" }
+        RULES {
+            map name -> Itemname
+                TRANSFORM upper()
+            map price -> Itemprice
+                AS float
+            map id -> Itemid
+        }
+    }'''
+    
+    mapper = SimpleMapper()
+    mapping = mapper.parse_mapping(dml)
+    
+    assert mapping['rules'] == [
+        {'source': 'name', 'target': 'Itemname', 'transform': 'upper'},
+        {'source': 'price', 'target': 'Itemprice', 'type': 'float'},
+        {'source': 'id', 'target': 'Itemid'},
+    ]
+    print("✓ Next-line transform test passed")
+
+
+def test_comments_ignored():
+    """Test that # and /* */ comments are not read as TRANSFORM or AS."""
+    dml = '''MAPPING comment_test {
+        SOURCE CSV { file: "input.csv" }  # not an XML source
+        TARGET CSV { file: "output.csv" }
+        RULES {
+            # map old -> Old
+            map amount -> Amount  # stored as float
+            /* AS int */
+            map code -> Code TRANSFORM format_number("#,##0") AS int
+            map note -> Note /* TRANSFORM upper()
+            AS float */ map label -> Label
+        }
+    }'''
+    
+    mapper = SimpleMapper()
+    mapping = mapper.parse_mapping(dml)
+    
+    assert mapping['source_type'] == 'CSV'
+    assert mapping['rules'] == [
+        {'source': 'amount', 'target': 'Amount'},
+        {'source': 'code', 'target': 'Code', 'transform': 'format_number', 'type': 'int'},
+        {'source': 'note', 'target': 'Note'},
+        {'source': 'label', 'target': 'Label'},
+    ]
+    print("✓ Comment test passed")
+
+
+CSV_TO_CSV_DML = '''MAPPING csv_columns {
+        SOURCE CSV { file: "input.csv" }
+        TARGET CSV { file: "output.csv" }
+        RULES {
+            map id -> Id AS int
+            map name -> Name TRANSFORM trim()
+            map price -> Price
+            map missing -> Missing
+        }
+    }'''
+
+
+def test_generated_csv_to_csv():
+    """Test running generated CSV to CSV code."""
+    result, output = run_generated(CSV_TO_CSV_DML)
+    
+    assert result == [
+        {'Id': 1, 'Name': 'widget', 'Price': '2.5', 'Missing': None},
+        {'Id': 2, 'Name': 'gadget', 'Price': None, 'Missing': None},
+    ]
+    assert output == "Id,Name,Price,Missing\r\n1,widget,2.5,\r\n2,gadget,,\r\n"
+    print("✓ Generated CSV to CSV test passed")
+
+
+def test_generated_csv_to_csv_streamed():
+    """Test streaming generated CSV to CSV code."""
+    expected = run_generated(CSV_TO_CSV_DML)[1]
+    result, output = run_generated(CSV_TO_CSV_DML, return_items=False)
+    
+    assert result is None
+    assert output == expected
+    print("✓ Generated CSV stream test passed")
+
+
+def test_generated_passthrough():
+    """Test generated code for rules that only copy fields."""
+    same_names = '''MAPPING copy_fields {
+        SOURCE CSV { file: "input.csv" }
+        TARGET XML { file: "output.xml" }
+        RULES {
+            map id -> id
+            map price -> price
+            map missing -> missing
+        }
+    }'''
+    renamed = same_names.replace('map id -> id', 'map id -> Itemid')
+    
+    result, output = run_generated(same_names)
+    assert result == [
+        {'id': '1', 'price': '2.5', 'missing': None},
+        {'id': '2', 'price': None, 'missing': None},
+    ]
+    assert '<price>2.5</price>' in output
+    
+    result, output = run_generated(renamed, return_items=False)
+    assert result is None
+    assert '<Itemid>2</Itemid>' in output
+    print("✓ Generated passthrough test passed")
+
+
+def test_generated_transform_value():
+    """Test the generated transform_value dispatch on its edge cases."""
+    mapper = SimpleMapper()
+    code = mapper.generate_code(mapper.parse_mapping(CSV_TO_CSV_DML))
+    namespace = {'__name__': 'generated_mapping'}
+    exec(compile(code, 'generated_mapping.py', 'exec'), namespace)
+    transform_value = namespace['transform_value']
+    
+    assert transform_value(None, 'upper') is None
+    assert transform_value(' a ', 'trim') == 'a'
+    assert transform_value('abc', 'no_such_transform') == 'abc'
+    assert transform_value('abc', 'int') == 'abc'
+    assert transform_value('7', 'int') == 7
+    print("✓ Generated transform_value test passed")
+
+
 def main():
     """Run all tests."""
     print("=" * 50)
@@ -157,6 +296,12 @@ def main():
         test_edi_to_csv,
         test_csv_to_edi,
         test_with_transform,
+        test_transform_on_next_line,
+        test_comments_ignored,
+        test_generated_csv_to_csv,
+        test_generated_csv_to_csv_streamed,
+        test_generated_passthrough,
+        test_generated_transform_value,
     ]
     
     passed = 0